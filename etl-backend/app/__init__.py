@@ -1,9 +1,12 @@
 import os
 
+import click
 from flask import Flask
 from .config import Config
 from .extensions import db, migrate, socketio
 from .importer.routes import importer_bp
+from .schema import backfill_match_keys, upgrade_schema
+from .tmdb_client import get_stats as get_tmdb_stats
 
 
 def create_app(config_class: type[Config] | None = None) -> Flask:
@@ -26,6 +29,7 @@ def create_app(config_class: type[Config] | None = None) -> Flask:
     # manual shell step on Railway to create tables.
     with app.app_context():
         db.create_all()
+        upgrade_schema()
 
     # Register blueprints
     app.register_blueprint(importer_bp, url_prefix="/api/import")
@@ -34,4 +38,15 @@ def create_app(config_class: type[Config] | None = None) -> Flask:
     def health() -> dict:
         return {"ok": True, "service": "showbuff-importer", "env": app.config.get("ENV", "prod")}
 
+    @app.get("/api/health/tmdb")
+    def health_tmdb() -> dict:
+        # Counters are per process; workers log theirs after each import.
+        return get_tmdb_stats()
+
+    @app.cli.command("backfill-match-keys")
+    @click.option("--all", "rebuild", is_flag=True, help="Recompute keys for every row, not only missing ones.")
+    def backfill_match_keys_command(rebuild: bool) -> None:
+        """Populate the normalized title keys used for catalog matching."""
+        click.echo(f"Updated {backfill_match_keys(rebuild=rebuild)} rows")
+
     return app
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import io
+import os
+import re
+import struct
+import tempfile
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, NamedTuple
+
+import redis
+from flask import current_app
+
+
+# Uploaded import files, handed from the web service to the Celery worker.
+#
+# On Railway the two run in separate containers without a shared disk, so by
+# default the bytes go through Redis (IMPORT_BLOB_BACKEND=redis). With
+# IMPORT_BLOB_BACKEND=filesystem they are written to IMPORT_BLOB_DIR, which
+# must then be visible to both (a mounted volume, or local development).
+# Either way blobs expire after IMPORT_BLOB_TTL_SECONDS if nobody deletes
+# them, e.g. when the import task failed. Uploads of at most
+# IMPORT_BLOB_INLINE_MAX_BYTES are not stored at all: the reference carries
+# them, base64-encoded, through the task message.
+#
+# References look like "redis:<name>", "file:<name>" or "inline:<base64>",
+# where <name> is a random hex id plus the upload's extension.
+#
+# Stored blobs start with a small header (format version, flags) and the
+# body is zlib-compressed (flag bit 0) unless the first _COMPRESS_PROBE_BYTES
+# show that it doesn't pay off, as for PDFs or zipped .xlsx files. Content
+# is streamed in _COPY_CHUNK_BYTES pieces both ways (APPEND and GETRANGE in
+# Redis), so a large upload is never held in memory whole.
+
+_REDIS_KEY_PREFIX = "showbuff:import-blob:"
+_NAME_RE = re.compile(r"^[0-9a-f]{32}(?:\.[a-z0-9]{1,8})?$")
+_SUFFIX_RE = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+_BLOB_FORMAT_VERSION = 1
+_BLOB_HEADER = struct.Struct("!BB")
+_FLAG_ZLIB = 0x01
+_COPY_CHUNK_BYTES = 1024 * 1024
+_COMPRESS_PROBE_BYTES = 64 * 1024
+_COMPRESS_MIN_SAVING = 0.1
+
+
+class BlobNotFoundError(LookupError):
+    """The referenced blob expired, was deleted or never existed."""
+
+
+class _Settings(NamedTuple):
+    backend: str
+    directory: str
+    ttl_seconds: int
+    inline_max_bytes: int
+
+
+def _settings() -> _Settings:
+    config = current_app.config
+    return _Settings(
+        backend=config.get("IMPORT_BLOB_BACKEND", "redis"),
+        directory=config.get("IMPORT_BLOB_DIR") or os.path.join(tempfile.gettempdir(), "showbuff-imports"),
+        ttl_seconds=int(config.get("IMPORT_BLOB_TTL_SECONDS", 24 * 60 * 60)),
+        inline_max_bytes=int(config.get("IMPORT_BLOB_INLINE_MAX_BYTES", 64 * 1024)),
+    )
+
+
+def _redis_client() -> redis.Redis:
+    # Blobs are written once per upload and read once per import, so a
+    # short-lived client is simpler than sharing one across forks.
+    return redis.from_url(current_app.config["REDIS_URL"])
+
+
+class _RedisBlobReader(io.RawIOBase):
+    """Read-only file over a Redis string, fetched one GETRANGE per read.
+
+    Closing it closes `client`.
+    """
+
+    def __init__(self, client: redis.Redis, key: str) -> None:
+        self._client = client
+        self._key = key
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._client.getrange(self._key, self._pos, self._pos + len(buffer) - 1)
+        buffer[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._client.close()
+        super().close()
+
+
+def _parse_ref(ref: str) -> tuple[str, str]:
+    scheme, _, name = (ref or "").partition(":")
+    if scheme == "inline" or (scheme in ("redis", "file") and _NAME_RE.match(name)):
+        return scheme, name
+    raise ValueError(f"invalid blob reference: {ref!r}")
+
+
+def _encoded_chunks(head: bytes, src: BinaryIO) -> Iterator[bytes]:
+    """Yield the stored form of `head` followed by the rest of `src`."""
+    probe = head[:_COMPRESS_PROBE_BYTES]
+    compressor = None
+    if len(zlib.compress(probe)) < len(probe) * (1 - _COMPRESS_MIN_SAVING):
+        compressor = zlib.compressobj()
+    del probe
+    yield _BLOB_HEADER.pack(_BLOB_FORMAT_VERSION, _FLAG_ZLIB if compressor else 0)
+
+    chunk = head
+    while chunk:
+        yield compressor.compress(chunk) if compressor else chunk
+        chunk = src.read(_COPY_CHUNK_BYTES)
+    if compressor:
+        yield compressor.flush()
+
+
+def _read_header(src: BinaryIO, ref: str) -> int:
+    header = src.read(_BLOB_HEADER.size)
+    if len(header) < _BLOB_HEADER.size:
+        raise BlobNotFoundError(f"{ref} (truncated)")
+    version, flags = _BLOB_HEADER.unpack(header)
+    if version != _BLOB_FORMAT_VERSION:
+        raise BlobNotFoundError(f"{ref} (unknown blob format {version})")
+    return flags
+
+
+def _copy_body(src: BinaryIO, dst: BinaryIO, flags: int) -> None:
+    decompressor = zlib.decompressobj() if flags & _FLAG_ZLIB else None
+    while chunk := src.read(_COPY_CHUNK_BYTES):
+        if decompressor is not None:
+            # Bound the output too, so a huge expansion never sits in memory
+            chunk = decompressor.decompress(chunk, _COPY_CHUNK_BYTES)
+            while chunk:
+                dst.write(chunk)
+                chunk = decompressor.decompress(decompressor.unconsumed_tail, _COPY_CHUNK_BYTES)
+        else:
+            dst.write(chunk)
+    if decompressor is not None:
+        dst.write(decompressor.flush())
+
+
+def _sweep_expired(directory: str, ttl_seconds: int) -> None:
+    cutoff = time.time() - ttl_seconds
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def put(src: bytes | BinaryIO, suffix: str = "") -> str:
+    """Store `src` (bytes or a binary file) and return a reference for
+    local_path()/delete().
+
+    Files are read to the end in chunks; if reading raises, nothing is
+    left behind. `suffix` (the upload's extension, e.g. ".pdf") is kept on
+    the name so readers can tell the format; anything unusual is dropped.
+    """
+    if isinstance(src, bytes):
+        src = io.BytesIO(src)
+    settings = _settings()
+    head = src.read(max(settings.inline_max_bytes + 1, _COMPRESS_PROBE_BYTES))
+    if len(head) <= settings.inline_max_bytes:
+        return "inline:" + base64.b64encode(head).decode("ascii")
+
+    suffix = suffix.lower() if _SUFFIX_RE.match(suffix.lower()) else ""
+    name = f"{uuid.uuid4().hex}{suffix}"
+    chunks = _encoded_chunks(head, src)
+    del head
+
+    if settings.backend == "filesystem":
+        os.makedirs(settings.directory, exist_ok=True)
+        _sweep_expired(settings.directory, settings.ttl_seconds)
+        path = os.path.join(settings.directory, name)
+        try:
+            with open(f"{path}.part", "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except BaseException:
+            os.remove(f"{path}.part")
+            raise
+        os.replace(f"{path}.part", path)
+        return f"file:{name}"
+
+    key = _REDIS_KEY_PREFIX + name
+    with _redis_client() as client:
+        # SET (with the TTL) then APPEND, so only one chunk is buffered at a time
+        try:
+            client.set(key, next(chunks), ex=settings.ttl_seconds)
+            for chunk in chunks:
+                if chunk:
+                    client.append(key, chunk)
+        except BaseException:
+            client.delete(key)
+            raise
+    return f"redis:{name}"
+
+
+@contextmanager
+def local_path(ref: str) -> Iterator[str]:
+    """Context manager yielding a local file path with the blob's content.
+
+    The content is decoded (decompressed) into a temporary file, with the
+    original extension, that is removed on exit. Raises BlobNotFoundError
+    if the blob is gone.
+    """
+    scheme, name = _parse_ref(ref)
+    suffix = os.path.splitext(name)[1]
+
+    if scheme == "inline":
+        try:
+            data = base64.b64decode(name, validate=True)
+        except binascii.Error as exc:
+            raise ValueError("invalid inline blob reference") from exc
+        src: BinaryIO = io.BytesIO(data)
+        del data
+        suffix = ""
+    elif scheme == "file":
+        try:
+            src = open(os.path.join(_settings().directory, name), "rb")
+        except FileNotFoundError:
+            raise BlobNotFoundError(ref) from None
+    else:
+        client = _redis_client()
+        key = _REDIS_KEY_PREFIX + name
+        if not client.exists(key):
+            client.close()
+            raise BlobNotFoundError(ref)
+        src = _RedisBlobReader(client, key)
+
+    with src:
+        flags = 0 if scheme == "inline" else _read_header(src, ref)
+        fd, path = tempfile.mkstemp(prefix="showbuff-import-", suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                _copy_body(src, dst, flags)
+        except BaseException:
+            os.remove(path)
+            raise
+    try:
+        yield path
+    finally:
+        os.remove(path)
+
+
+def delete(ref: str) -> None:
+    """Remove a blob; missing blobs are ignored."""
+    scheme, name = _parse_ref(ref)
+    if scheme == "inline":
+        return
+    if scheme == "file":
+        try:
+            os.remove(os.path.join(_settings().directory, name))
+        except FileNotFoundError:
+            pass
+        return
+    with _redis_client() as client:
+        client.delete(_REDIS_KEY_PREFIX + name)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import redis
+
+
+log = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Failure-count circuit breaker, shared through Redis when available.
+
+    Once `threshold` failures are recorded within `window_seconds` the
+    circuit opens for `cooldown_seconds`: every process sharing the Redis
+    sees it open and should fail fast instead of calling the upstream. When
+    the cooldown expires calls flow again, and the next run of failures
+    re-opens it. Without Redis (or while it is unreachable) the same logic
+    runs per process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int,
+        window_seconds: float,
+        cooldown_seconds: float,
+        redis_client: redis.Redis | None = None,
+    ) -> None:
+        self.name = name
+        self.threshold = max(int(threshold), 1)
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._failures_key = f"circuit:{name}:failures"
+        self._open_key = f"circuit:{name}:open"
+        self._redis = redis_client
+
+        self._lock = threading.Lock()
+        self._local_failures: list[float] = []
+        # Open-until timestamp (monotonic), also used to skip Redis round
+        # trips while we already know the circuit is open.
+        self._open_until = 0.0
+
+    def is_open(self) -> bool:
+        if time.monotonic() < self._open_until:
+            return True
+        if self._redis is None:
+            return False
+        try:
+            ttl_ms = self._redis.pttl(self._open_key)
+        except redis.RedisError as exc:
+            log.warning("Circuit %s state unavailable, using local state: %s", self.name, exc)
+            return False
+        if ttl_ms and ttl_ms > 0:
+            self._open_until = time.monotonic() + ttl_ms / 1000
+            return True
+        return False
+
+    def _open(self) -> None:
+        log.warning("Circuit %s opened for %ss", self.name, self.cooldown_seconds)
+        self._open_until = time.monotonic() + self.cooldown_seconds
+
+    def record_failure(self) -> None:
+        if self._redis is not None:
+            try:
+                failures = self._redis.incr(self._failures_key)
+                if failures == 1:
+                    self._redis.expire(self._failures_key, max(int(self.window_seconds), 1))
+                if failures >= self.threshold:
+                    pipe = self._redis.pipeline()
+                    pipe.set(self._open_key, "1", px=int(self.cooldown_seconds * 1000))
+                    pipe.delete(self._failures_key)
+                    pipe.execute()
+                    self._open()
+                return
+            except redis.RedisError as exc:
+                log.warning("Circuit %s state unavailable, using local state: %s", self.name, exc)
+
+        with self._lock:
+            now = time.monotonic()
+            self._local_failures = [t for t in self._local_failures if now - t < self.window_seconds]
+            self._local_failures.append(now)
+            if len(self._local_failures) >= self.threshold:
+                self._local_failures = []
+                self._open()
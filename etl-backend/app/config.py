@@ -32,9 +32,76 @@ class Config:
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     CELERY_BROKER_URL: str = REDIS_URL
     CELERY_RESULT_BACKEND: str = REDIS_URL
+    # Connection pool used by the TMDB cache/limiter client (one per process)
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))
+    REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
 
     # TMDB
     TMDB_API_KEY: str = os.getenv("TMDB_API_KEY", "")
+    # "split": /search/movie + /search/tv per title; "multi": one /search/multi
+    TMDB_SEARCH_MODE: str = os.getenv("TMDB_SEARCH_MODE", "split")
+    # Keep-alive HTTP pool shared by all TMDB calls in a process
+    TMDB_HTTP_POOL_CONNECTIONS: int = int(os.getenv("TMDB_HTTP_POOL_CONNECTIONS", "4"))  # per-host pools kept
+    TMDB_HTTP_POOL_MAXSIZE: int = int(os.getenv("TMDB_HTTP_POOL_MAXSIZE", "16"))  # connections per host
+    TMDB_HTTP_CONNECT_TIMEOUT: float = float(os.getenv("TMDB_HTTP_CONNECT_TIMEOUT", "3.05"))
+    TMDB_HTTP_READ_TIMEOUT: float = float(os.getenv("TMDB_HTTP_READ_TIMEOUT", "10"))
+    # Negative search cache: no results / failed lookups
+    TMDB_EMPTY_CACHE_TTL_SECONDS: int = int(os.getenv("TMDB_EMPTY_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+    TMDB_ERROR_CACHE_TTL_SECONDS: int = int(os.getenv("TMDB_ERROR_CACHE_TTL_SECONDS", "60"))
+    # Past their TTL, search results (and empty results) stay in Redis this much
+    # longer; such stale hits are served immediately and refreshed in the background.
+    TMDB_CACHE_STALE_GRACE_SECONDS: int = int(os.getenv("TMDB_CACHE_STALE_GRACE_SECONDS", str(24 * 60 * 60)))
+    # Cached search payloads at least this large are zlib-compressed
+    TMDB_CACHE_COMPRESS_MIN_BYTES: int = int(os.getenv("TMDB_CACHE_COMPRESS_MIN_BYTES", "512"))
+    # Max wait for another process already fetching the same TMDB query;
+    # also the lifetime of its single-flight lock.
+    TMDB_SINGLE_FLIGHT_TIMEOUT_SECONDS: float = float(os.getenv("TMDB_SINGLE_FLIGHT_TIMEOUT_SECONDS", "10"))
+    # In-process LRU in front of the Redis search cache (0 entries disables)
+    TMDB_LOCAL_CACHE_MAX_ENTRIES: int = int(os.getenv("TMDB_LOCAL_CACHE_MAX_ENTRIES", "2048"))
+    TMDB_LOCAL_CACHE_MAX_BYTES: int = int(os.getenv("TMDB_LOCAL_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    TMDB_LOCAL_CACHE_TTL_SECONDS: float = float(os.getenv("TMDB_LOCAL_CACHE_TTL_SECONDS", "600"))
+    # Token bucket per TMDB endpoint, shared by all processes via Redis.
+    # TMDB_RATE_LIMITS overrides single buckets: "tmdb_search_tv=10:20,..."
+    # (rate per second:burst).
+    TMDB_RATE_LIMIT_PER_SEC: float = float(os.getenv("TMDB_RATE_LIMIT_PER_SEC", "20"))
+    TMDB_RATE_LIMIT_BURST: int = int(os.getenv("TMDB_RATE_LIMIT_BURST", "10"))
+    TMDB_RATE_LIMITS: str = os.getenv("TMDB_RATE_LIMITS", "")
+    # Retries (jittered exponential backoff) and the shared circuit breaker:
+    # after THRESHOLD failures within WINDOW seconds, TMDB calls fail fast for
+    # COOLDOWN seconds and imports fall back to local-only matching.
+    TMDB_MAX_RETRIES: int = int(os.getenv("TMDB_MAX_RETRIES", "3"))
+    TMDB_RETRY_BACKOFF_BASE: float = float(os.getenv("TMDB_RETRY_BACKOFF_BASE", "0.5"))
+    TMDB_RETRY_BACKOFF_MAX: float = float(os.getenv("TMDB_RETRY_BACKOFF_MAX", "8"))
+    TMDB_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("TMDB_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    TMDB_CIRCUIT_WINDOW_SECONDS: float = float(os.getenv("TMDB_CIRCUIT_WINDOW_SECONDS", "60"))
+    TMDB_CIRCUIT_COOLDOWN_SECONDS: float = float(os.getenv("TMDB_CIRCUIT_COOLDOWN_SECONDS", "30"))
+    # Max TMDB searches in flight per import (1 = sequential)
+    TMDB_MAX_CONCURRENCY: int = int(os.getenv("TMDB_MAX_CONCURRENCY", "8"))
+
+    # Matching
+    # Minimum trigram similarity (0..1) for a "local_fuzzy" catalog match.
+    FUZZY_MATCH_THRESHOLD: float = float(os.getenv("FUZZY_MATCH_THRESHOLD", "0.5"))
+
+    # File parsing
+    # Processes used to extract PDF pages in parallel (1 = sequential), and
+    # the page count below which PDFs are always read sequentially.
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(os.cpu_count() or 1, 4))))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+    # Largest accepted import upload (413 beyond it). MAX_CONTENT_LENGTH caps
+    # the whole request, form fields included, so Werkzeug can refuse an
+    # oversized upload from its Content-Length before reading the body.
+    IMPORT_MAX_UPLOAD_BYTES: int = int(os.getenv("IMPORT_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+    MAX_CONTENT_LENGTH: int = IMPORT_MAX_UPLOAD_BYTES + 64 * 1024
+
+    # Uploaded files handed to the worker (see app.blob_store): "redis", or
+    # "filesystem" with IMPORT_BLOB_DIR shared between web and worker.
+    IMPORT_BLOB_BACKEND: str = os.getenv("IMPORT_BLOB_BACKEND", "redis")
+    IMPORT_BLOB_DIR: str = os.getenv("IMPORT_BLOB_DIR", "")
+    IMPORT_BLOB_TTL_SECONDS: int = int(os.getenv("IMPORT_BLOB_TTL_SECONDS", str(24 * 60 * 60)))
+    # Uploads up to this size ride along in the task message instead
+    IMPORT_BLOB_INLINE_MAX_BYTES: int = int(os.getenv("IMPORT_BLOB_INLINE_MAX_BYTES", str(64 * 1024)))
 
     # Misc
     ENV: str = os.getenv("FLASK_ENV", "production")
@@ -1,54 +1,98 @@
 from __future__ import annotations
 
+import math
+import multiprocessing
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Iterable
+from datetime import date, datetime
+from itertools import chain
+from typing import Iterable, Iterator
 
+import billiard
+import openpyxl
 import pdfplumber
 import pandas as pd
+from flask import current_app, has_app_context
 
+from ..normalize import canonical_title
 
+
+_LINE_RE = re.compile(r"[^\r\n]+")
 _TITLE_YEAR_RE = re.compile(r"^(?P<title>.+?)(?:\s*\((?P<year>19\d{2}|20\d{2})\))?$")
 
+# Streaming-history lines that name an episode rather than a title, e.g.
+# Netflix "Breaking Bad: Season 2: Grilled" or "Show S01E03". The series
+# title is what precedes the marker. Only real season/episode markers count:
+# "Part 2", "Chapter 3" and "Episode I" name films just as often ("John Wick:
+# Chapter 3 - Parabellum", "Star Wars: Episode 1 - The Phantom Menace"), so
+# those lines are left whole and searched as movies too.
+_SEP = r"\s*[:\-\u2013\u2014|]\s*"
+_EPISODE_RE = re.compile(
+    rf"""^(?P<series>.+?)(?:
+        {_SEP}(?:season|series|temporada|staffel|saison)\s+\w+(?:{_SEP}.*)?
+      | {_SEP}(?:limited\s+series|miniseries)(?:{_SEP}.*)?
+      | (?:{_SEP}|[\s.]+)s\d{{1,2}}\s*e\d{{1,3}}\b.*
+      | (?:{_SEP}|\s+)\d{{1,2}}x\d{{2,3}}\b.*
+      | \s*\((?:season|series)\s+\d+\)
+    )$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
 
 @dataclass
 class ExtractedTitleRecord:
     raw_text: str
     normalized_title: str | None
     year: int | None
+    # "tv" when the line named an episode/season and was reduced to its series
+    media_hint: str | None = None
 
 
 def _normalize_title(text: str | None) -> str | None:
-    if not text:
+    return canonical_title(text)
+
+
+def _collapse_episode(title: str) -> tuple[str, str | None]:
+    """Reduce an episode/season line to its series title and a "tv" hint."""
+    match = _EPISODE_RE.match(title)
+    if match and match.group("series").strip():
+        return match.group("series"), "tv"
+    return title, None
+
+
+def _record_from_line(line: str) -> ExtractedTitleRecord | None:
+    match = _TITLE_YEAR_RE.match(line)
+    if not match:
         return None
-    cleaned = re.sub(r"\s+", " ", text).strip()
-    return cleaned or None
 
+    title, media_hint = _collapse_episode(match.group("title"))
+    title = _normalize_title(title)
+    year_str = match.group("year")
+    year = int(year_str) if year_str else None
 
-def _iter_text_lines(path: str) -> Iterable[str]:
-    ext = os.path.splitext(path)[1].lower()
+    if not title:
+        return None
+
+    return ExtractedTitleRecord(
+        raw_text=line,
+        normalized_title=title,
+        year=year,
+        media_hint=media_hint,
+    )
+
+
+def _iter_text_lines(path: str, ext: str | None = None) -> Iterable[str]:
+    ext = ext or os.path.splitext(path)[1].lower()
     if ext in {".txt", ".log"}:
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
             for line in f:
                 yield line.strip()
-    elif ext in {".csv", ".tsv"}:
-        sep = "," if ext == ".csv" else "\t"
-        df = pd.read_csv(path, sep=sep)
-        for col in df.columns:
-            for value in df[col].astype(str).tolist():
-                yield value
-    elif ext in {".xlsx", ".xls"}:
-        df = pd.read_excel(path)
-        for col in df.columns:
-            for value in df[col].astype(str).tolist():
-                yield value
+    elif ext in _TABLE_EXTS:
+        yield from _iter_all_cells(path, ext)
     elif ext in {".pdf"}:
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                for line in text.splitlines():
-                    yield line.strip()
+        yield from _iter_pdf_lines(path)
     else:
         # Fallback: treat as plain text
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
@@ -56,59 +100,304 @@ def _iter_text_lines(path: str) -> Iterable[str]:
                 yield line.strip()
 
 
-def extract_titles_from_file(path: str) -> list[ExtractedTitleRecord]:
-    """Best-effort extraction of titles from a TXT/PDF/CSV/Excel file.
+# Pages handed to a PDF worker process per task: small enough that the first
+# pages come back quickly, large enough to amortise reopening the file.
+_PDF_PAGES_PER_TASK = 4
 
-    This is intentionally conservative: we keep non-empty lines and try to
-    parse an optional year in parentheses at the end.
+
+def _pdf_page_lines(path: str, start: int, stop: int) -> list[str]:
+    """Text lines of pages [start, stop); runs in a worker process."""
+    lines: list[str] = []
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages[start:stop]:
+            text = page.extract_text() or ""
+            lines.extend(line.strip() for line in text.splitlines())
+            page.close()
+    return lines
+
+
+def _pdf_settings() -> tuple[int, int]:
+    config = current_app.config if has_app_context() else {}
+    return config.get("PDF_EXTRACT_WORKERS", 1), config.get("PDF_PARALLEL_MIN_PAGES", 16)
+
+
+def _iter_pdf_lines(path: str, workers: int | None = None, min_pages: int | None = None) -> Iterator[str]:
+    """Lines of a PDF in page order.
+
+    Documents of at least `min_pages` pages are split into
+    _PDF_PAGES_PER_TASK-page ranges extracted by up to `workers` processes
+    (PDF_EXTRACT_WORKERS / PDF_PARALLEL_MIN_PAGES by default). Results are
+    yielded in page order as soon as each range is done, so early pages are
+    matched while later ones are still being extracted. Small documents and
+    workers <= 1 read pages sequentially instead.
+
+    Celery prefork children are daemonic, and the stdlib refuses to start
+    processes from those; there billiard's pool (Celery's own fork of
+    multiprocessing, which has no such restriction) is used instead.
     """
-    records: list[ExtractedTitleRecord] = []
+    default_workers, default_min_pages = _pdf_settings()
+    workers = default_workers if workers is None else workers
+    min_pages = default_min_pages if min_pages is None else min_pages
 
-    for line in _iter_text_lines(path):
-        if not line:
-            continue
+    with pdfplumber.open(path) as pdf:
+        page_count = len(pdf.pages)
+        if workers <= 1 or page_count < min_pages:
+            for page in pdf.pages:
+                text = page.extract_text() or ""
+                for line in text.splitlines():
+                    yield line.strip()
+                page.close()
+            return
 
-        match = _TITLE_YEAR_RE.match(line)
-        if not match:
-            continue
+    ranges = [
+        (path, start, min(start + _PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, _PDF_PAGES_PER_TASK)
+    ]
+    processes = min(workers, len(ranges))
+
+    if multiprocessing.current_process().daemon:
+        billiard_pool = billiard.Pool(processes=processes)
+        try:
+            results = [billiard_pool.apply_async(_pdf_page_lines, args) for args in ranges]
+            for result in results:
+                yield from result.get()
+        finally:
+            billiard_pool.terminate()
+            billiard_pool.join()
+        return
+
+    pool = ProcessPoolExecutor(max_workers=processes)
+    try:
+        futures = [pool.submit(_pdf_page_lines, *args) for args in ranges]
+        for future in futures:
+            yield from future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Spreadsheet-like exports. Their title (and year) columns are detected from
+# the header so that dates, ratings, URLs and IDs never become "titles".
+_TABLE_EXTS = {".csv", ".tsv", ".xlsx", ".xls"}
+_TABLE_CHUNK_ROWS = 5000
+
+# Recognised headers (compared via _header_key), in order of preference.
+# Letterboxd: Name/Year; IMDb: Title/Year (+ Release Date); Netflix: Title.
+_TITLE_HEADERS = (
+    "title",
+    "name",
+    "movie title",
+    "series title",
+    "primary title",
+    "original title",
+    "movie",
+    "film",
+    "show",
+    "series",
+    "program",
+)
+_YEAR_HEADERS = ("year", "release year", "start year", "startyear", "release date", "first air date", "released")
+_YEAR_IN_CELL_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+
+# Maps "title"/"year" to the header names to use instead of detection.
+ColumnMap = dict[str, str]
+
+
+def _header_key(header: object) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", str(header).casefold()).strip()
+
+
+def detect_title_columns(columns: Iterable[object], column_map: ColumnMap | None = None) -> tuple[object, object]:
+    """Pick the (title, year) columns of a table header.
+
+    Entries in `column_map` ({"title": ..., "year": ...}) win when they name
+    an existing column (compared like detected headers). Either result may
+    be None.
+    """
+    by_key: dict[str, object] = {}
+    for column in columns:
+        by_key.setdefault(_header_key(column), column)
+
+    def pick(role: str, candidates: tuple[str, ...]) -> object:
+        wanted = (column_map or {}).get(role)
+        if wanted and _header_key(wanted) in by_key:
+            return by_key[_header_key(wanted)]
+        return next((by_key[h] for h in candidates if h in by_key), None)
+
+    return pick("title", _TITLE_HEADERS), pick("year", _YEAR_HEADERS)
 
-        title = _normalize_title(match.group("title"))
-        year_str = match.group("year")
-        year = int(year_str) if year_str else None
 
+def _read_table(src, ext: str, usecols=None) -> Iterator[pd.DataFrame]:
+    """DataFrames of a CSV/TSV (in chunks) or Excel source, as strings."""
+    if hasattr(src, "seek"):
+        src.seek(0)
+    if ext in {".xlsx", ".xls"}:
+        yield pd.read_excel(src, usecols=usecols, dtype=str)
+        return
+    sep = "\t" if ext == ".tsv" else ","
+    try:
+        reader = pd.read_csv(src, sep=sep, usecols=usecols, dtype=str, chunksize=_TABLE_CHUNK_ROWS)
+    except pd.errors.EmptyDataError:
+        return
+    with reader:
+        yield from reader
+
+
+def _iter_all_cells(src, ext: str) -> Iterator[str]:
+    # Header-less or unrecognised tables: every cell is a candidate title.
+    for frame in _read_table(src, ext):
+        for col in frame.columns:
+            for value in frame[col].dropna().tolist():
+                yield value.strip()
+
+
+def _cell_text(value: object) -> str:
+    # Spreadsheet cells may be numbers ("1917", "2012") or dates.
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _year_from_cell(value: object) -> int | None:
+    if isinstance(value, (date, datetime)):
+        return value.year
+    match = _YEAR_IN_CELL_RE.search(_cell_text(value))
+    return int(match.group(1)) if match else None
+
+
+def _records_from_cells(rows: Iterable[tuple[object, object]]) -> Iterator[ExtractedTitleRecord]:
+    """Title records from (title cell, year cell) pairs."""
+    for title_cell, year_cell in rows:
+        title = _cell_text(title_cell)
         if not title:
             continue
+        record = _record_from_line(title)
+        if record is None:
+            continue
+        record.year = _year_from_cell(year_cell) or record.year
+        yield record
 
-        records.append(ExtractedTitleRecord(raw_text=line, normalized_title=title, year=year))
 
-    return records
+def _iter_xlsx_records(src, column_map: ColumnMap | None) -> Iterator[ExtractedTitleRecord]:
+    """Stream an .xlsx workbook row by row (openpyxl read-only mode).
 
+    Every sheet is read with its first row as the header; sheets without a
+    recognisable title column contribute every cell instead.
+    """
+    if hasattr(src, "seek"):
+        src.seek(0)
+    workbook = openpyxl.load_workbook(src, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            title_col, year_col = detect_title_columns([h for h in header if h is not None], column_map)
+            if title_col is None:
+                cells = (_cell_text(v) for row in chain([header], rows) for v in row)
+                yield from iter_titles_from_lines(cells)
+                continue
+            title_idx = header.index(title_col)
+            year_idx = header.index(year_col) if year_col is not None else None
+            yield from _records_from_cells(
+                (
+                    row[title_idx] if title_idx < len(row) else None,
+                    row[year_idx] if year_idx is not None and year_idx < len(row) else None,
+                )
+                for row in rows
+            )
+    finally:
+        workbook.close()
 
-def extract_titles_from_text(text: str) -> list[ExtractedTitleRecord]:
-    """Extract titles from an in-memory text blob.
 
-    This mirrors extract_titles_from_file but operates on a string, which is
-    ideal when Celery workers run in a separate container and cannot access
-    the web server's filesystem.
+def iter_titles_from_table(src, ext: str, column_map: ColumnMap | None = None) -> Iterator[ExtractedTitleRecord]:
+    """Title records from a CSV/TSV/Excel export (path or binary buffer).
+
+    Only the title and year columns are read (CSV in _TABLE_CHUNK_ROWS
+    chunks, .xlsx streamed row by row); the year comes from the year column
+    when there is one, else from a "(1999)" suffix in the title cell. Tables
+    without a recognisable title column fall back to treating every cell as
+    a line.
     """
-    records: list[ExtractedTitleRecord] = []
+    if ext == ".xlsx":
+        yield from _iter_xlsx_records(src, column_map)
+        return
+
+    wanted = {*_TITLE_HEADERS, *_YEAR_HEADERS, *(_header_key(v) for v in (column_map or {}).values())}
+    title_col = year_col = None
+    for frame in _read_table(src, ext, usecols=lambda c: _header_key(c) in wanted):
+        if title_col is None:
+            title_col, year_col = detect_title_columns(frame.columns, column_map)
+            if title_col is None:
+                break
+        years = frame[year_col].tolist() if year_col is not None else [None] * len(frame)
+        yield from _records_from_cells(zip(frame[title_col].tolist(), years))
 
-    for raw_line in (text or "").splitlines():
+    if title_col is None:
+        yield from iter_titles_from_lines(_iter_all_cells(src, ext))
+
+
+def iter_titles_from_lines(lines: Iterable[str]) -> Iterator[ExtractedTitleRecord]:
+    """Lazily turn lines into title records.
+
+    Blank lines and lines without a usable title are skipped; an optional
+    year in parentheses at the end is parsed, and episode lines from
+    streaming histories are reduced to their series title (see
+    _collapse_episode). Nothing is buffered, so callers can start matching
+    before the source is exhausted.
+    """
+    for raw_line in lines:
         line = raw_line.strip()
         if not line:
             continue
 
-        match = _TITLE_YEAR_RE.match(line)
-        if not match:
-            continue
+        record = _record_from_line(line)
+        if record:
+            yield record
 
-        title = _normalize_title(match.group("title"))
-        year_str = match.group("year")
-        year = int(year_str) if year_str else None
 
-        if not title:
-            continue
+def iter_titles_from_file(
+    path: str, column_map: ColumnMap | None = None, ext: str | None = None
+) -> Iterator[ExtractedTitleRecord]:
+    """Streaming version of extract_titles_from_file.
+
+    The format comes from `ext` (e.g. ".pdf") when given, else from the
+    path's extension.
+    """
+    ext = (ext or os.path.splitext(path)[1]).lower()
+    if ext in _TABLE_EXTS:
+        return iter_titles_from_table(path, ext, column_map)
+    return iter_titles_from_lines(_iter_text_lines(path, ext))
+
 
-        records.append(ExtractedTitleRecord(raw_text=line, normalized_title=title, year=year))
+def iter_titles_from_text(text: str) -> Iterator[ExtractedTitleRecord]:
+    """Streaming version of extract_titles_from_text.
 
-    return records
+    Lines are sliced out of the text one at a time rather than split into a
+    list up front; LF, CRLF and a lone CR all end a line.
+    """
+    return iter_titles_from_lines(m.group() for m in _LINE_RE.finditer(text or ""))
+
+
+def extract_titles_from_file(path: str, column_map: ColumnMap | None = None) -> list[ExtractedTitleRecord]:
+    """Best-effort extraction of titles from a TXT/PDF/CSV/Excel file.
+
+    This is intentionally conservative: we keep non-empty lines and try to
+    parse an optional year in parentheses at the end. Episode lines from
+    streaming histories are reduced to their series title (see
+    _collapse_episode). CSV/TSV/Excel files only contribute their title
+    column when one is found (see iter_titles_from_table).
+    """
+    return list(iter_titles_from_file(path, column_map))
+
+
+def extract_titles_from_text(text: str) -> list[ExtractedTitleRecord]:
+    """Extract titles from an in-memory text blob.
+
+    This mirrors extract_titles_from_file but operates on a string, which is
+    ideal when Celery workers run in a separate container and cannot access
+    the web server's filesystem.
+    """
+    return list(iter_titles_from_text(text))
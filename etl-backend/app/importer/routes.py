@@ -1,16 +1,48 @@
 from __future__ import annotations
 
+import hashlib
 import os
+from typing import BinaryIO
 from uuid import UUID
 
 import requests
-from flask import request, jsonify
+from flask import current_app, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from . import importer_bp
+from .. import blob_store
 from ..extensions import db
 from ..models import ImportSession, ExtractedTitle, TitleMatch, Movie, TVShow
 
 
+class _UploadReader:
+    """Wraps an upload stream: counts and hashes what is read through it,
+    and raises RequestEntityTooLarge once more than `max_bytes` went by."""
+
+    def __init__(self, stream: BinaryIO, max_bytes: int) -> None:
+        self._stream = stream
+        self._max_bytes = max_bytes
+        self._sha256 = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self._max_bytes:
+            raise RequestEntityTooLarge()
+        self._sha256.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+@importer_bp.errorhandler(RequestEntityTooLarge)
+def upload_too_large(exc: RequestEntityTooLarge):
+    max_bytes = current_app.config.get("IMPORT_MAX_UPLOAD_BYTES")
+    return jsonify({"error": "file too large", "maxBytes": max_bytes}), 413
+
+
 @importer_bp.post("/file")
 def upload_file():
     """Upload a file and enqueue background import processing.
@@ -20,6 +52,10 @@ def upload_file():
     - listType (optional): target list type (watchlist/currently-watching/watched)
     - source (optional): import source label
     - userId (optional): user identifier (string)
+    - titleColumn / yearColumn (optional): CSV/TSV/Excel header names to
+      read titles and years from, instead of detecting them
+
+    Files larger than IMPORT_MAX_UPLOAD_BYTES are rejected with 413.
     """
     if "file" not in request.files:
         return jsonify({"error": "file is required"}), 400
@@ -31,28 +67,46 @@ def upload_file():
     user_id = request.form.get("userId") or request.headers.get("X-User-Id")
     source = request.form.get("source", "file")
 
-    session = ImportSession(user_id=user_id, source=source, status="pending", original_filename=file.filename)
+    # The Celery worker runs in a separate container and cannot see this web
+    # container's filesystem, so the raw bytes go to the shared blob store
+    # and only a reference (plus the extension, to pick the extractor) is
+    # queued. Binary formats like PDF and Excel survive intact. Werkzeug has
+    # already spooled the upload (to a temporary file unless it is small);
+    # it is copied from there in chunks, sized and hashed on the way, and
+    # abandoned as soon as it exceeds the limit.
+    file_format = os.path.splitext(file.filename)[1].lower()
+    upload = _UploadReader(file.stream, current_app.config["IMPORT_MAX_UPLOAD_BYTES"])
+    blob_ref = blob_store.put(upload, file_format)
+
+    session = ImportSession(
+        user_id=user_id,
+        source=source,
+        status="pending",
+        original_filename=file.filename,
+        upload_bytes=upload.bytes_read,
+        upload_sha256=upload.hexdigest(),
+    )
     db.session.add(session)
     db.session.commit()
 
-    # Read file contents into memory; the Celery worker runs in a separate
-    # container and cannot see this web container's filesystem, so we send
-    # the text instead of a path.
-    file_bytes = file.read() or b""
-    try:
-        file_text = file_bytes.decode("utf-8", errors="ignore")
-    except Exception:
-        file_text = ""
-
     list_type = request.form.get("listType")
+    column_map = {
+        role: request.form[field]
+        for role, field in (("title", "titleColumn"), ("year", "yearColumn"))
+        if request.form.get(field)
+    }
 
     # Enqueue Celery task (import Celery lazily to avoid circular imports
     # during Flask app initialization)
     from celery_app import celery
 
+    kwargs = {"blob_ref": blob_ref, "file_format": file_format}
+    if column_map:
+        kwargs["column_map"] = column_map
     celery.send_task(
         "tasks.process_import_file",
-        args=[str(session.id), file_text, list_type, user_id],
+        args=[str(session.id), None, list_type, user_id],
+        kwargs=kwargs,
     )
 
     return jsonify({"importId": str(session.id), "status": session.status})
@@ -107,6 +161,7 @@ def get_import_matches(import_id: str):
                 "rawText": t.raw_text,
                 "normalizedTitle": t.normalized_title,
                 "year": t.year,
+                "mediaHint": t.media_hint,
                 "matches": matches_payload,
             }
         )
@@ -119,6 +174,8 @@ def get_import_matches(import_id: str):
             "totalTitles": session.total_titles,
             "matchedCount": session.matched_count,
             "unmatchedCount": session.unmatched_count,
+            "uniqueTitles": session.unique_titles,
+            "dedupeRatio": round(session.total_titles / session.unique_titles, 2) if session.unique_titles else None,
             "titles": titles,
         }
     )
@@ -274,8 +331,12 @@ def search_for_title(import_id: str, extracted_id: int):
     Body:
     {
       "title": "...",  # optional override for normalized title
-      "year": 2024       # optional
+      "year": 2024,      # optional
+      "mediaHint": "tv"  # optional: "tv", or null to search movies too
     }
+
+    Overriding the title or year drops the media hint taken from the
+    upload (e.g. "tv" for episode lines) unless mediaHint is given.
     """
     try:
         session_id = UUID(import_id)
@@ -298,6 +359,10 @@ def search_for_title(import_id: str, extracted_id: int):
         extracted.normalized_title = override_title
     if isinstance(override_year, int):
         extracted.year = override_year
+    if "mediaHint" in payload:
+        extracted.media_hint = "tv" if payload["mediaHint"] == "tv" else None
+    elif override_title or isinstance(override_year, int):
+        extracted.media_hint = None
 
     TitleMatch.query.filter_by(extracted_title_id=extracted.id).delete()
     db.session.flush()
@@ -345,6 +410,7 @@ def search_for_title(import_id: str, extracted_id: int):
             "rawText": extracted.raw_text,
             "normalizedTitle": extracted.normalized_title,
             "year": extracted.year,
+            "mediaHint": extracted.media_hint,
             "matches": matches_payload,
         }
     )
@@ -1,125 +1,365 @@
 from __future__ import annotations
 
-from typing import Iterable
+import logging
+from typing import Any, Iterator, Sequence
 
-from sqlalchemy import or_, func
+from flask import current_app
+from sqlalchemy import func, text
 
 from ..extensions import db
 from ..models import Movie, TVShow, ExtractedTitle, TitleMatch
-from ..tmdb_client import search_tmdb_movies, search_tmdb_tv
+from ..normalize import normalize_match_key, trigram_similarity
+from ..tmdb_client import TMDBUnavailableError, search_many, search_tmdb_movies_and_tv, search_tmdb_tv
+
+
+log = logging.getLogger(__name__)
+
+# Max local candidates per media type for a single extracted title.
+LOCAL_MATCH_LIMIT = 5
+
+# Max fuzzy candidates per media type for a single extracted title.
+FUZZY_MATCH_LIMIT = 3
+
+# Titles per tmdb_client.search_many call when resolving a whole import.
+_TMDB_BATCH_SIZE = 100
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit.
+_BULK_CHUNK_SIZE = 500
+
+
+def _popularity_order(row) -> tuple[bool, float]:
+    # Mirrors ORDER BY popularity DESC NULLS LAST
+    return (row.popularity is None, -(row.popularity or 0.0))
+
+
+def _fetch_local_candidates(model, keys: list[str]) -> dict[str, list]:
+    """Load every catalog row whose match_key is in `keys`.
+
+    Returns rows grouped by match_key, in primary key order. The lookup is an
+    index seek on the (match_key, year) index.
+    """
+    grouped: dict[str, list] = {}
+    for start in range(0, len(keys), _BULK_CHUNK_SIZE):
+        chunk = keys[start : start + _BULK_CHUNK_SIZE]
+        rows = model.query.filter(model.match_key.in_(chunk)).order_by(model.id).all()
+        for row in rows:
+            grouped.setdefault(row.match_key, []).append(row)
+    return grouped
+
+
+def _mark_ambiguous(matches: list[TitleMatch]) -> list[TitleMatch]:
+    if len(matches) > 1:
+        for m in matches:
+            m.is_ambiguous = True
+    return matches
+
+
+def find_local_matches_bulk(extracted_titles: Sequence[ExtractedTitle]) -> list[list[TitleMatch]]:
+    """Resolve local exact matches for many extracted titles at once.
+
+    Equivalent to running the local stage of find_matches_for_extracted_title
+    for each title, but with a handful of set-based queries instead of two
+    queries per title. Returns one list of matches per input title, in order.
+    """
+    keys = sorted({k for k in (normalize_match_key(e.normalized_title) for e in extracted_titles) if k})
+    if not keys:
+        return [[] for _ in extracted_titles]
+
+    # Titles hinted as TV (episode lines) are never matched against movies.
+    movie_keys = sorted(
+        {k for k in (normalize_match_key(e.normalized_title) for e in extracted_titles if e.media_hint != "tv") if k}
+    )
+    movies_by_key = _fetch_local_candidates(Movie, movie_keys) if movie_keys else {}
+    shows_by_key = _fetch_local_candidates(TVShow, keys)
+
+    results: list[list[TitleMatch]] = []
+    for extracted in extracted_titles:
+        key = normalize_match_key(extracted.normalized_title)
+        if not key:
+            results.append([])
+            continue
+
+        year = extracted.year
+        movies = movies_by_key.get(key, []) if extracted.media_hint != "tv" else []
+        shows = shows_by_key.get(key, [])
+        if year:
+            movies = [m for m in movies if m.year == year]
+            shows = [s for s in shows if s.first_air_year == year]
+
+        movies = sorted(movies, key=_popularity_order)[:LOCAL_MATCH_LIMIT]
+        shows = sorted(shows, key=_popularity_order)[:LOCAL_MATCH_LIMIT]
+
+        matches: list[TitleMatch] = []
+        for m in movies:
+            matches.append(
+                TitleMatch(
+                    extracted_title=extracted,
+                    media_type="movie",
+                    tmdb_id=m.tmdb_id,
+                    local_id=m.id,
+                    confidence=0.95,
+                    match_method="local_exact",
+                    is_ambiguous=False,
+                )
+            )
+
+        for s in shows:
+            matches.append(
+                TitleMatch(
+                    extracted_title=extracted,
+                    media_type="tv",
+                    tmdb_id=s.tmdb_id,
+                    local_id=s.id,
+                    confidence=0.95,
+                    match_method="local_exact",
+                    is_ambiguous=False,
+                )
+            )
+
+        # Local matches may be ambiguous; the UI can ask the user to pick one.
+        results.append(_mark_ambiguous(matches))
+
+    return results
+
+
+# Engine URL -> whether the pg_trgm extension is installed there.
+_pg_trgm_available: dict[str, bool] = {}
+
+
+def _use_pg_trgm() -> bool:
+    engine = db.engine
+    if engine.dialect.name != "postgresql":
+        return False
+    url = str(engine.url)
+    if url not in _pg_trgm_available:
+        row = db.session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+        _pg_trgm_available[url] = row is not None
+    return _pg_trgm_available[url]
+
+
+def _fuzzy_candidates(model, year_column, key: str, year: int | None, threshold: float) -> list[tuple]:
+    """Return (row, similarity) pairs for catalog rows whose match_key is
+    similar to `key`, best first.
+
+    Postgres uses the pg_trgm GIN index via the % operator and finds nothing
+    when the extension is missing; SQLite (dev/tests) computes the same
+    similarity in-process.
+    """
+    if _use_pg_trgm():
+        # Transaction-local threshold so `%` (and therefore the index) filters
+        # at our cutoff rather than pg_trgm's default of 0.3.
+        db.session.execute(
+            text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+            {"threshold": str(threshold)},
+        )
+        similarity = func.similarity(model.match_key, key)
+        query = db.session.query(model, similarity).filter(model.match_key.op("%")(key))
+        if year:
+            query = query.filter(year_column == year)
+        query = query.order_by(similarity.desc(), model.popularity.desc().nullslast())
+        return [(row, float(sim)) for row, sim in query.limit(FUZZY_MATCH_LIMIT).all()]
+    if db.engine.dialect.name != "sqlite":
+        # Scanning a production catalog in Python for every title is too slow.
+        return []
+
+    query = model.query.filter(model.match_key.isnot(None))
+    if year:
+        query = query.filter(year_column == year)
+    scored = []
+    for row in query.all():
+        sim = trigram_similarity(row.match_key, key)
+        if sim >= threshold:
+            scored.append((row, sim))
+    scored.sort(key=lambda pair: (-pair[1],) + _popularity_order(pair[0]))
+    return scored[:FUZZY_MATCH_LIMIT]
+
+
+_ROMAN_NUMERALS = {"ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8, "ix": 9, "x": 10}
+_NUMBER_WORDS = {
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+}
+
+
+def _sequel_markers(key: str) -> tuple[int, ...]:
+    """Numbers in a match key ("2", "ii" and "two" all count as 2).
+
+    Sequels differ from the original mostly by such a marker, which costs
+    little trigram similarity ("toy story 2" vs "toy story" is 0.83).
+    """
+    markers = []
+    for token in key.split():
+        if token.isdigit():
+            markers.append(int(token))
+        elif token in _ROMAN_NUMERALS:
+            markers.append(_ROMAN_NUMERALS[token])
+        elif token in _NUMBER_WORDS:
+            markers.append(_NUMBER_WORDS[token])
+    return tuple(markers)
+
+
+def _find_fuzzy_matches(extracted: ExtractedTitle) -> tuple[list[TitleMatch], bool]:
+    """Fuzzy candidates, not yet attached to `extracted`, and whether they
+    are conclusive.
+
+    They are only conclusive when the title has a year (so candidates were
+    filtered by it) and the best candidate carries the same sequel markers.
+    Otherwise "Aliens" would settle on "Alien" and "Creed II" on "Creed".
+    """
+    key = normalize_match_key(extracted.normalized_title)
+    if not key:
+        return [], False
+
+    threshold = current_app.config.get("FUZZY_MATCH_THRESHOLD", 0.5)
+    year = extracted.year
+
+    scored: list[tuple[TitleMatch, str]] = []
+    for media_type, model, year_column in (("movie", Movie, Movie.year), ("tv", TVShow, TVShow.first_air_year)):
+        if media_type == "movie" and extracted.media_hint == "tv":
+            continue
+        for row, sim in _fuzzy_candidates(model, year_column, key, year, threshold):
+            match = TitleMatch(
+                media_type=media_type,
+                tmdb_id=row.tmdb_id,
+                local_id=row.id,
+                confidence=round(0.9 * sim, 3),
+                match_method="local_fuzzy",
+                is_ambiguous=False,
+            )
+            scored.append((match, row.match_key))
+
+    if not scored:
+        return [], False
+    scored.sort(key=lambda pair: -pair[0].confidence)
+    conclusive = bool(year) and _sequel_markers(scored[0][1]) == _sequel_markers(key)
+    return _mark_ambiguous([match for match, _ in scored]), conclusive
+
+
+def _attach(matches: list[TitleMatch], extracted: ExtractedTitle) -> list[TitleMatch]:
+    for m in matches:
+        m.extracted_title = extracted
+    return matches
+
+
+def _merge_inconclusive_fuzzy(tmdb_matches: list[TitleMatch], fuzzy: list[TitleMatch]) -> list[TitleMatch]:
+    """TMDB matches followed by the fuzzy candidates TMDB didn't also find,
+    which are always marked ambiguous."""
+    found = {(m.media_type, m.tmdb_id) for m in tmdb_matches}
+    extra = [m for m in fuzzy if (m.media_type, m.tmdb_id) not in found]
+    for m in extra:
+        m.is_ambiguous = True
+    return _mark_ambiguous(tmdb_matches + extra)
+
+
+def find_fuzzy_matches_for_extracted_title(extracted: ExtractedTitle) -> list[TitleMatch]:
+    """Trigram similarity search against the local catalog.
+
+    Catches typos and small title variations that miss the exact key.
+    Candidates below FUZZY_MATCH_THRESHOLD are ignored; confidence scales
+    with similarity.
+    """
+    return _attach(_find_fuzzy_matches(extracted)[0], extracted)
+
+
+def find_fallback_matches_for_extracted_title(extracted: ExtractedTitle) -> list[TitleMatch]:
+    """Matching stages after a local exact miss: local fuzzy, then TMDB.
+
+    A conclusive fuzzy match (see _find_fuzzy_matches) resolves the title
+    locally, without TMDB calls. Otherwise TMDB is searched and any fuzzy
+    candidates are offered alongside its results, marked ambiguous.
+    """
+    fuzzy, conclusive = _find_fuzzy_matches(extracted)
+    if conclusive:
+        return _attach(fuzzy, extracted)
+    return _attach(_merge_inconclusive_fuzzy(find_tmdb_matches_for_extracted_title(extracted), fuzzy), extracted)
 
 
 def find_matches_for_extracted_title(extracted: ExtractedTitle) -> list[TitleMatch]:
     """Simple local DB search for a given extracted title.
 
     Strategy:
-    - Case-insensitive exact match on title/name.
+    - Exact match on the normalized title key (see normalize_match_key).
     - Optional year filter when available.
     - Rank by popularity descending.
+    - Fall back to trigram fuzzy matching on the local catalog, then to TMDB
+      search unless the fuzzy match is conclusive.
     """
     title = (extracted.normalized_title or "").strip()
     if not title:
         return []
 
-    year = extracted.year
+    # 1) Local DB exact matches first (fast, cheap)
+    matches = find_local_matches_bulk([extracted])[0]
+    if matches:
+        return matches
 
-    movie_query = Movie.query.filter(func.lower(Movie.title) == func.lower(title))
-    tv_query = TVShow.query.filter(func.lower(TVShow.name) == func.lower(title))
+    return find_fallback_matches_for_extracted_title(extracted)
 
-    if year:
-        movie_query = movie_query.filter(Movie.year == year)
-        tv_query = tv_query.filter(TVShow.first_air_year == year)
 
-    movie_query = movie_query.order_by(Movie.popularity.desc().nullslast())
-    tv_query = tv_query.order_by(TVShow.popularity.desc().nullslast())
+# Basic heuristic: take top N TMDB results and assign decreasing confidence.
+_MAX_TMDB_RESULTS = 3
 
-    movies = movie_query.limit(5).all()
-    shows = tv_query.limit(5).all()
 
-    matches: list[TitleMatch] = []
+def _upsert_movie(data) -> Movie | None:
+    tmdb_id = data.get("id")
+    if not tmdb_id:
+        return None
+    movie = Movie.query.filter_by(tmdb_id=tmdb_id).first()
+    if not movie:
+        movie = Movie(tmdb_id=tmdb_id)
+        db.session.add(movie)
+    movie.title = data.get("title") or data.get("original_title") or movie.title or ""
+    movie.original_title = data.get("original_title") or movie.original_title
+    release_date = data.get("release_date") or ""
+    try:
+        movie.year = int(release_date[:4]) if release_date else movie.year
+    except ValueError:
+        pass
+    movie.popularity = data.get("popularity") or movie.popularity
+    movie.adult = bool(data.get("adult", False))
+    return movie
 
-    # 1) Local DB exact matches first (fast, cheap)
-    for m in movies:
-        matches.append(
-            TitleMatch(
-                extracted_title=extracted,
-                media_type="movie",
-                tmdb_id=m.tmdb_id,
-                local_id=m.id,
-                confidence=0.95,
-                match_method="local_exact",
-                is_ambiguous=False,
-            )
-        )
 
-    for s in shows:
-        matches.append(
-            TitleMatch(
-                extracted_title=extracted,
-                media_type="tv",
-                tmdb_id=s.tmdb_id,
-                local_id=s.id,
-                confidence=0.95,
-                match_method="local_exact",
-                is_ambiguous=False,
-            )
-        )
-
-    # If we already have local matches, return them (they may be ambiguous and
-    # the UI can ask the user to pick one).
-    if matches:
-        if len(matches) > 1:
-            for m in matches:
-                m.is_ambiguous = True
-        return matches
+def _upsert_tv(data) -> TVShow | None:
+    tmdb_id = data.get("id")
+    if not tmdb_id:
+        return None
+    show = TVShow.query.filter_by(tmdb_id=tmdb_id).first()
+    if not show:
+        show = TVShow(tmdb_id=tmdb_id)
+        db.session.add(show)
+    show.name = data.get("name") or data.get("original_name") or show.name or ""
+    show.original_name = data.get("original_name") or show.original_name
+    first_air_date = data.get("first_air_date") or ""
+    try:
+        show.first_air_year = int(first_air_date[:4]) if first_air_date else show.first_air_year
+    except ValueError:
+        pass
+    show.popularity = data.get("popularity") or show.popularity
+    show.adult = bool(data.get("adult", False))
+    return show
 
-    # 2) Fallback to TMDB search (movies + TV) and upsert into our local DB.
-    tmdb_movies = search_tmdb_movies(title, year)
-    tmdb_shows = search_tmdb_tv(title, year)
 
-    # Basic heuristic: take top N results and assign decreasing confidence.
-    MAX_RESULTS = 3
+def _build_tmdb_matches(
+    extracted: ExtractedTitle, tmdb_movies: list[dict[str, Any]], tmdb_shows: list[dict[str, Any]]
+) -> list[TitleMatch]:
+    """Upsert TMDB search results into our catalog and wrap them as matches.
 
-    def _upsert_movie(data) -> Movie | None:
-        tmdb_id = data.get("id")
-        if not tmdb_id:
-            return None
-        movie = Movie.query.filter_by(tmdb_id=tmdb_id).first()
-        if not movie:
-            movie = Movie(tmdb_id=tmdb_id)
-            db.session.add(movie)
-        movie.title = data.get("title") or data.get("original_title") or movie.title or ""
-        movie.original_title = data.get("original_title") or movie.original_title
-        release_date = data.get("release_date") or ""
-        try:
-            movie.year = int(release_date[:4]) if release_date else movie.year
-        except ValueError:
-            pass
-        movie.popularity = data.get("popularity") or movie.popularity
-        movie.adult = bool(data.get("adult", False))
-        return movie
-
-    def _upsert_tv(data) -> TVShow | None:
-        tmdb_id = data.get("id")
-        if not tmdb_id:
-            return None
-        show = TVShow.query.filter_by(tmdb_id=tmdb_id).first()
-        if not show:
-            show = TVShow(tmdb_id=tmdb_id)
-            db.session.add(show)
-        show.name = data.get("name") or data.get("original_name") or show.name or ""
-        show.original_name = data.get("original_name") or show.original_name
-        first_air_date = data.get("first_air_date") or ""
-        try:
-            show.first_air_year = int(first_air_date[:4]) if first_air_date else show.first_air_year
-        except ValueError:
-            pass
-        show.popularity = data.get("popularity") or show.popularity
-        show.adult = bool(data.get("adult", False))
-        return show
+    Touches the DB session, so it must run on the caller's (task) thread.
+    The matches are attached to `extracted` only at the end, so the upsert
+    queries don't autoflush half-built ones.
+    """
+    matches: list[TitleMatch] = []
 
     # Movies
-    for idx, data in enumerate(tmdb_movies[:MAX_RESULTS]):
+    for idx, data in enumerate(tmdb_movies[:_MAX_TMDB_RESULTS]):
         movie = _upsert_movie(data)
         if not movie:
             continue
@@ -128,7 +368,6 @@ def find_matches_for_extracted_title(extracted: ExtractedTitle) -> list[TitleMat
         confidence = 0.9 if idx == 0 else 0.75
         matches.append(
             TitleMatch(
-                extracted_title=extracted,
                 media_type="movie",
                 tmdb_id=movie.tmdb_id,
                 local_id=movie.id,
@@ -139,7 +378,7 @@ def find_matches_for_extracted_title(extracted: ExtractedTitle) -> list[TitleMat
         )
 
     # TV shows
-    for idx, data in enumerate(tmdb_shows[:MAX_RESULTS]):
+    for idx, data in enumerate(tmdb_shows[:_MAX_TMDB_RESULTS]):
         show = _upsert_tv(data)
         if not show:
             continue
@@ -147,7 +386,6 @@ def find_matches_for_extracted_title(extracted: ExtractedTitle) -> list[TitleMat
         confidence = 0.9 if idx == 0 else 0.75
         matches.append(
             TitleMatch(
-                extracted_title=extracted,
                 media_type="tv",
                 tmdb_id=show.tmdb_id,
                 local_id=show.id,
@@ -158,8 +396,140 @@ def find_matches_for_extracted_title(extracted: ExtractedTitle) -> list[TitleMat
         )
 
     # Mark ambiguous if we have multiple matches
-    if len(matches) > 1:
-        for m in matches:
-            m.is_ambiguous = True
+    return _attach(_mark_ambiguous(matches), extracted)
 
-    return matches
+
+def find_tmdb_matches_for_extracted_title(extracted: ExtractedTitle) -> list[TitleMatch]:
+    """Search TMDB for an extracted title and upsert results into our local DB."""
+    title = (extracted.normalized_title or "").strip()
+    if not title:
+        return []
+
+    try:
+        if extracted.media_hint == "tv":
+            tmdb_movies, tmdb_shows = [], search_tmdb_tv(title, extracted.year)
+        else:
+            tmdb_movies, tmdb_shows = search_tmdb_movies_and_tv(title, extracted.year)
+    except TMDBUnavailableError:
+        log.warning("TMDB unavailable; no remote matches for extracted title %s", extracted.id)
+        return []
+    return _build_tmdb_matches(extracted, tmdb_movies, tmdb_shows)
+
+
+TitleGroupKey = tuple[str, int | None, str | None]
+
+
+def title_group_key(extracted: ExtractedTitle) -> TitleGroupKey:
+    """(match key, year, media hint): extracted titles sharing it always get
+    the same matches."""
+    title = (extracted.normalized_title or "").strip()
+    return normalize_match_key(title) or title.casefold(), extracted.year, extracted.media_hint
+
+
+def group_duplicate_titles(extracted_titles: Sequence[ExtractedTitle]) -> dict[TitleGroupKey, list[int]]:
+    """Group indexes of `extracted_titles` by title_group_key.
+
+    Watch-history exports repeat the same title once per episode; every
+    group only needs to be matched once. Groups and the indexes within them
+    keep input order.
+    """
+    groups: dict[TitleGroupKey, list[int]] = {}
+    for idx, extracted in enumerate(extracted_titles):
+        groups.setdefault(title_group_key(extracted), []).append(idx)
+    return groups
+
+
+def copy_matches(matches: Sequence[TitleMatch], extracted: ExtractedTitle | None) -> list[TitleMatch]:
+    """Copies of `matches` attached to another (duplicate) extracted title.
+
+    With `extracted=None` the copies are detached templates that stay usable
+    after the session commits or expires the originals.
+    """
+    return [
+        TitleMatch(
+            extracted_title=extracted,
+            media_type=m.media_type,
+            tmdb_id=m.tmdb_id,
+            local_id=m.local_id,
+            confidence=m.confidence,
+            match_method=m.match_method,
+            is_ambiguous=m.is_ambiguous,
+        )
+        for m in matches
+    ]
+
+
+def iter_matches_for_extracted_titles(
+    extracted_titles: Sequence[ExtractedTitle], max_concurrency: int | None = None
+) -> Iterator[tuple[int, list[TitleMatch]]]:
+    """Resolve matches for a whole import, yielding (index, matches) pairs.
+
+    Local exact matches are resolved in bulk and fuzzy matches one by one on
+    the calling thread; inconclusive fuzzy candidates don't stop a title
+    from reaching TMDB. TMDB searches for the remaining titles (movie and TV
+    separately; TV only for titles with a "tv" media hint) go through
+    tmdb_client.search_many in batches: one cache round trip per batch, with
+    misses fanned out over a bounded thread pool whose workers only do
+    HTTP/cache work and share the Redis rate limiter.
+    Upserts and TitleMatch creation happen here, on the caller's session
+    thread. Titles resolved locally are yielded first, TMDB-resolved ones
+    follow in input order, with any fuzzy candidates merged in. If TMDB's
+    circuit breaker opens, the remaining titles are yielded with just their
+    fuzzy candidates (local-only) instead of waiting on timeouts.
+    """
+    if max_concurrency is None:
+        max_concurrency = current_app.config.get("TMDB_MAX_CONCURRENCY", 1)
+
+    resolved: list[tuple[int, list[TitleMatch]]] = []
+    pending: list[int] = []
+    # Inconclusive fuzzy candidates, merged with the TMDB results later
+    fuzzy_by_idx: dict[int, list[TitleMatch]] = {}
+    # The bulk local matches hang off their titles but only join the session
+    # once the caller adds them; the fuzzy queries must not autoflush first.
+    with db.session.no_autoflush:
+        for idx, (extracted, matches) in enumerate(zip(extracted_titles, find_local_matches_bulk(extracted_titles))):
+            if not matches and (extracted.normalized_title or "").strip():
+                fuzzy, conclusive = _find_fuzzy_matches(extracted)
+                if not conclusive:
+                    pending.append(idx)
+                    fuzzy_by_idx[idx] = fuzzy
+                    continue
+                matches = _attach(fuzzy, extracted)
+            resolved.append((idx, matches))
+    yield from resolved
+
+    tmdb_available = True
+    for start in range(0, len(pending), _TMDB_BATCH_SIZE):
+        batch = pending[start : start + _TMDB_BATCH_SIZE]
+        if not tmdb_available:
+            for idx in batch:
+                yield idx, _attach(_merge_inconclusive_fuzzy([], fuzzy_by_idx[idx]), extracted_titles[idx])
+            continue
+
+        # Per title, the positions of its movie and TV results in `queries`;
+        # TV-hinted titles skip the movie search.
+        queries: list[tuple[str, int | None, str]] = []
+        slots: list[tuple[int | None, int]] = []
+        for idx in batch:
+            title = extracted_titles[idx].normalized_title.strip()
+            year = extracted_titles[idx].year
+            movie_pos = None
+            if extracted_titles[idx].media_hint != "tv":
+                movie_pos = len(queries)
+                queries.append((title, year, "movie"))
+            slots.append((movie_pos, len(queries)))
+            queries.append((title, year, "tv"))
+
+        try:
+            results = search_many(queries, max_workers=max(1, max_concurrency))
+        except TMDBUnavailableError:
+            log.warning("TMDB unavailable; finishing import with local matches only")
+            tmdb_available = False
+            for idx in batch:
+                yield idx, _attach(_merge_inconclusive_fuzzy([], fuzzy_by_idx[idx]), extracted_titles[idx])
+            continue
+
+        for idx, (movie_pos, tv_pos) in zip(batch, slots):
+            movies = results[movie_pos] if movie_pos is not None else []
+            tmdb_matches = _build_tmdb_matches(extracted_titles[idx], movies, results[tv_pos])
+            yield idx, _attach(_merge_inconclusive_fuzzy(tmdb_matches, fuzzy_by_idx[idx]), extracted_titles[idx])
@@ -3,9 +3,10 @@ import uuid
 
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy import Index, String, Integer, Float, Boolean, Text, DateTime, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from .extensions import db
+from .normalize import normalize_match_key
 
 
 class Movie(db.Model):
@@ -18,6 +19,13 @@ class Movie(db.Model):
     year: Mapped[int | None] = mapped_column(Integer)
     popularity: Mapped[float | None] = mapped_column(Float)
     adult: Mapped[bool] = mapped_column(Boolean, default=False)
+    # normalize_match_key(title); kept in sync by the validator below
+    match_key: Mapped[str | None] = mapped_column(String(255))
+
+    @validates("title")
+    def _sync_match_key(self, key: str, value: str) -> str:
+        self.match_key = normalize_match_key(value) or None
+        return value
 
     def __repr__(self) -> str:  # pragma: no cover - debug only
         return f"<Movie tmdb_id={self.tmdb_id} title={self.title!r}>"
@@ -33,6 +41,13 @@ class TVShow(db.Model):
     first_air_year: Mapped[int | None] = mapped_column(Integer)
     popularity: Mapped[float | None] = mapped_column(Float)
     adult: Mapped[bool] = mapped_column(Boolean, default=False)
+    # normalize_match_key(name); kept in sync by the validator below
+    match_key: Mapped[str | None] = mapped_column(String(255))
+
+    @validates("name")
+    def _sync_match_key(self, key: str, value: str) -> str:
+        self.match_key = normalize_match_key(value) or None
+        return value
 
 
 class ImportSession(db.Model):
@@ -46,6 +61,11 @@ class ImportSession(db.Model):
     total_titles: Mapped[int] = mapped_column(Integer, default=0)
     matched_count: Mapped[int] = mapped_column(Integer, default=0)
     unmatched_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Distinct (match key, year) pairs among total_titles; each was matched once
+    unique_titles: Mapped[int | None] = mapped_column(Integer)
+    # Size and SHA-256 (hex) of the uploaded file
+    upload_bytes: Mapped[int | None] = mapped_column(Integer)
+    upload_sha256: Mapped[str | None] = mapped_column(String(64))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -60,6 +80,8 @@ class ExtractedTitle(db.Model):
     raw_text: Mapped[str] = mapped_column(Text, nullable=False)
     normalized_title: Mapped[str | None] = mapped_column(String(255), index=True)
     year: Mapped[int | None] = mapped_column(Integer)
+    # "tv" for episode/season lines reduced to their series title
+    media_hint: Mapped[str | None] = mapped_column(String(8))
 
     import_session: Mapped[ImportSession] = relationship(back_populates="extracted_titles")
     matches: Mapped[list["TitleMatch"]] = relationship(back_populates="extracted_title", cascade="all, delete-orphan")
@@ -80,5 +102,16 @@ class TitleMatch(db.Model):
     extracted_title: Mapped[ExtractedTitle] = relationship(back_populates="matches")
 
 
+class AppSetting(db.Model):
+    """Deployment state kept in the database, e.g. the match key version."""
+
+    __tablename__ = "app_settings"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[str] = mapped_column(String(255))
+
+
+Index("ix_movies_match_key_year", Movie.match_key, Movie.year)
+Index("ix_tv_shows_match_key_year", TVShow.match_key, TVShow.first_air_year)
 Index("ix_title_matches_tmdb", TitleMatch.tmdb_id)
 Index("ix_extracted_titles_norm_year", ExtractedTitle.normalized_title, ExtractedTitle.year)
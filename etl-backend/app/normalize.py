@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+
+
+_APOSTROPHES = {"'", "’", "‘", "`"}
+_LEADING_ARTICLE_RE = re.compile(r"^(?:the|a|an)\s+")
+_TRAILING_ARTICLE_RE = re.compile(r",\s*(?:the|a|an)$")
+_TRAILING_ARTICLE_CASED_RE = re.compile(r"^(?P<title>.+?),\s*(?P<article>the|a|an)$", re.IGNORECASE)
+
+# Latin letters that carry no combining mark to strip but are commonly typed
+# without their stroke/ligature.
+_LATIN_FOLDS = str.maketrans({"ø": "o", "ł": "l", "đ": "d", "æ": "ae", "œ": "oe", "ı": "i"})
+
+
+def fold_diacritics(text: str) -> str:
+    """Strip accents from Latin letters ("Amélie" -> "Amelie").
+
+    Only marks on Latin base letters are removed, so scripts where combining
+    marks change the letter itself (e.g. Japanese kana voicing) are kept.
+    """
+    out: list[str] = []
+    latin_base = False
+    for ch in unicodedata.normalize("NFKD", text):
+        if unicodedata.combining(ch):
+            if not latin_base:
+                out.append(ch)
+            continue
+        latin_base = ch < "\u0250"
+        out.append(ch)
+    return unicodedata.normalize("NFC", "".join(out)).translate(_LATIN_FOLDS)
+
+
+def canonical_title(text: str | None) -> str | None:
+    """Display form of a parsed title, used for TMDB queries.
+
+    NFKC-normalizes, collapses whitespace and moves a trailing article from
+    sorted exports to the front ("Matrix, The" -> "The Matrix"). Case and
+    accents are kept; normalize_match_key(canonical_title(t)) equals
+    normalize_match_key(t).
+    """
+    if not text:
+        return None
+    value = " ".join(unicodedata.normalize("NFKC", text).split())
+    sorted_form = _TRAILING_ARTICLE_CASED_RE.match(value)
+    if sorted_form:
+        value = f"{sorted_form.group('article')} {sorted_form.group('title')}"
+    return value or None
+
+
+# Bump whenever normalize_match_key's output changes for some input; stored
+# catalog keys are then rebuilt on the next startup (see app.schema).
+# 2: accent folding ("Amélie" -> "amelie").
+MATCH_KEY_VERSION = 2
+
+
+def normalize_match_key(text: str | None) -> str:
+    """Build the key used for exact title matching against the catalog.
+
+    The key is NFKC-normalized, casefolded and accent-folded, drops a
+    leading article (and a trailing ", The" as used in sorted exports),
+    removes apostrophes and turns any other punctuation/symbols into single
+    spaces. "The Matrix", "matrix, the" and "THE MATRIX!" all map to
+    "matrix"; "Amélie" and "Amelie" both map to "amelie".
+
+    This is the one canonical title key: catalog rows, parsed titles and
+    TMDB search cache keys all use it.
+    """
+    if not text:
+        return ""
+
+    value = fold_diacritics(unicodedata.normalize("NFKC", text).casefold()).strip()
+    value = _TRAILING_ARTICLE_RE.sub("", value)
+    value = "".join(
+        "" if ch in _APOSTROPHES else " " if unicodedata.category(ch)[0] in "PS" else ch
+        for ch in value
+    )
+    value = " ".join(value.split())
+    return _LEADING_ARTICLE_RE.sub("", value)
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigram set of `text`, computed the same way as PostgreSQL's pg_trgm.
+
+    Each alphanumeric word is padded with two leading spaces and one trailing
+    space before being split into three-character windows.
+    """
+    grams: set[str] = set()
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """In-process equivalent of pg_trgm's similarity(a, b)."""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import redis
+
+
+log = logging.getLogger(__name__)
+
+# After a 429 the bucket's rate is halved and then climbs back linearly to its
+# configured rate over this many seconds.
+_RECOVERY_SECONDS = 30.0
+
+# Never throttle below this fraction of the configured rate.
+_MIN_RATE_FRACTION = 0.1
+
+# Atomic token bucket shared by every process talking to the same Redis.
+#
+# Acquiring *reserves* tokens: the balance may go negative, and the caller is
+# told exactly how long to sleep before its reservation is due. That makes
+# waits exact and roughly FIFO across processes without polling. A caller
+# that is not willing to wait `max_wait` seconds reserves nothing.
+#
+# KEYS[1] bucket key
+# ARGV    rate, burst, requested tokens, max_wait (-1 = unbounded), recovery
+# Returns {granted (0/1), wait seconds as a string}
+_ACQUIRE_LUA = """
+local key = KEYS[1]
+local cap_rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local recovery = tonumber(ARGV[5])
+
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local s = redis.call("HMGET", key, "tokens", "ts", "throttle_rate", "throttle_ts")
+
+local rate = cap_rate
+if s[3] then
+  rate = math.min(cap_rate, tonumber(s[3]) + recovery * math.max(0, now - tonumber(s[4])))
+end
+local tokens = tonumber(s[1]) or burst
+local ts = tonumber(s[2]) or now
+if now > ts then
+  tokens = math.min(burst, tokens + (now - ts) * rate)
+end
+
+local wait = 0
+if tokens < requested then
+  wait = (requested - tokens) / rate
+end
+if max_wait >= 0 and wait > max_wait then
+  return {0, tostring(wait)}
+end
+
+redis.call("HSET", key, "tokens", tostring(tokens - requested), "ts", tostring(now))
+redis.call("EXPIRE", key, math.ceil(burst / rate + wait) + 60)
+return {1, tostring(wait)}
+"""
+
+# Feedback from TMDB: multiply the current rate by ARGV[3] (0.5 on a 429,
+# 1 for a plain pause) and push the balance far enough below zero that the
+# next reservation becomes due ARGV[4] seconds from now.
+#
+# KEYS[1] bucket key
+# ARGV    rate, min rate, factor, pause seconds, recovery
+_THROTTLE_LUA = """
+local key = KEYS[1]
+local cap_rate = tonumber(ARGV[1])
+local min_rate = tonumber(ARGV[2])
+local factor = tonumber(ARGV[3])
+local pause = tonumber(ARGV[4])
+local recovery = tonumber(ARGV[5])
+
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local s = redis.call("HMGET", key, "tokens", "ts", "throttle_rate", "throttle_ts")
+
+local rate = cap_rate
+if s[3] then
+  rate = math.min(cap_rate, tonumber(s[3]) + recovery * math.max(0, now - tonumber(s[4])))
+end
+local tokens = tonumber(s[1]) or 0
+local ts = tonumber(s[2]) or now
+if now > ts then
+  tokens = tokens + (now - ts) * rate
+end
+
+rate = math.max(min_rate, rate * factor)
+tokens = math.min(tokens, 1 - pause * rate)
+
+redis.call("HSET", key, "tokens", tostring(tokens), "ts", tostring(now),
+           "throttle_rate", tostring(rate), "throttle_ts", tostring(now))
+redis.call("EXPIRE", key, math.ceil(pause + cap_rate / recovery) + 60)
+return tostring(rate)
+"""
+
+
+class TokenBucket:
+    """Token bucket rate limiter, shared through Redis when available.
+
+    `rate` is tokens per second and `burst` the bucket capacity. Without a
+    Redis client (or while Redis is unreachable) an equivalent in-process
+    bucket is used so callers are still paced.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, redis_client: redis.Redis | None = None) -> None:
+        self.name = name
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self.min_rate = max(self.rate * _MIN_RATE_FRACTION, 0.1)
+        self.recovery = self.rate / _RECOVERY_SECONDS
+        self.key = f"ratelimit:bucket:{name}"
+
+        self._redis = redis_client
+        if redis_client is not None:
+            self._acquire_script = redis_client.register_script(_ACQUIRE_LUA)
+            self._throttle_script = redis_client.register_script(_THROTTLE_LUA)
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._ts = time.monotonic()
+        self._throttle_rate: float | None = None
+        self._throttle_ts = 0.0
+
+    # -- local fallback ---------------------------------------------------
+
+    def _local_rate(self, now: float) -> float:
+        if self._throttle_rate is None:
+            return self.rate
+        return min(self.rate, self._throttle_rate + self.recovery * (now - self._throttle_ts))
+
+    def _local_reserve(self, tokens: int, max_wait: float | None) -> tuple[bool, float]:
+        with self._lock:
+            now = time.monotonic()
+            rate = self._local_rate(now)
+            balance = min(self.burst, self._tokens + (now - self._ts) * rate)
+            wait = (tokens - balance) / rate if balance < tokens else 0.0
+            if max_wait is not None and wait > max_wait:
+                return False, wait
+            self._tokens = balance - tokens
+            self._ts = now
+            return True, wait
+
+    def _local_throttle(self, factor: float, pause: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            rate = self._local_rate(now)
+            balance = self._tokens + (now - self._ts) * rate
+            rate = max(self.min_rate, rate * factor)
+            self._tokens = min(balance, 1 - pause * rate)
+            self._ts = now
+            self._throttle_rate = rate
+            self._throttle_ts = now
+
+    # -- public API -------------------------------------------------------
+
+    def _reserve(self, tokens: int, max_wait: float | None) -> tuple[bool, float]:
+        if self._redis is not None:
+            try:
+                granted, wait = self._acquire_script(
+                    keys=[self.key],
+                    args=[self.rate, self.burst, tokens, -1 if max_wait is None else max_wait, self.recovery],
+                )
+                return bool(int(granted)), float(wait)
+            except redis.RedisError as exc:
+                log.warning("Rate limiter %s falling back to in-process bucket: %s", self.name, exc)
+        return self._local_reserve(tokens, max_wait)
+
+    def acquire(self, tokens: int = 1, timeout: float | None = None) -> bool:
+        """Block until `tokens` are available; returns False (without
+        consuming anything) if that would take longer than `timeout`."""
+        granted, wait = self._reserve(tokens, timeout)
+        if not granted:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """Take `tokens` only if they are available right now."""
+        granted, _ = self._reserve(tokens, 0.0)
+        return granted
+
+    def throttle(self, pause: float, factor: float = 0.5) -> None:
+        """Hold every caller for `pause` seconds and scale the rate by `factor`.
+
+        Used on 429 responses (halve the rate, honour Retry-After); the rate
+        then recovers to its configured value over _RECOVERY_SECONDS.
+        """
+        if self._redis is not None:
+            try:
+                self._throttle_script(
+                    keys=[self.key],
+                    args=[self.rate, self.min_rate, factor, max(pause, 0.0), self.recovery],
+                )
+                return
+            except redis.RedisError as exc:
+                log.warning("Rate limiter %s falling back to in-process bucket: %s", self.name, exc)
+        self._local_throttle(factor, max(pause, 0.0))
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import logging
+
+from typing import Callable
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.schema import CreateIndex
+
+from .extensions import db
+from .models import AppSetting, ExtractedTitle, ImportSession, Movie, TVShow
+from .normalize import MATCH_KEY_VERSION, normalize_match_key
+
+
+log = logging.getLogger(__name__)
+
+# Columns added after the initial schema shipped. db.create_all() only
+# creates missing tables, so existing deployments need these added by hand.
+_ADDED_COLUMNS = [
+    Movie.__table__.c.match_key,
+    TVShow.__table__.c.match_key,
+    ImportSession.__table__.c.unique_titles,
+    ImportSession.__table__.c.upload_bytes,
+    ImportSession.__table__.c.upload_sha256,
+    ExtractedTitle.__table__.c.media_hint,
+]
+
+
+def _column_exists(table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(db.engine).get_columns(table)}
+
+
+def _index_exists(table: str, index: str) -> bool:
+    return index in {i["name"] for i in inspect(db.engine).get_indexes(table)}
+
+
+def _execute_ddl(ddl, created_elsewhere: Callable[[], bool], what: str) -> None:
+    """Run `ddl` in its own transaction.
+
+    The web service and the Celery worker both upgrade the schema when they
+    start, usually at the same moment after a deploy, so the other one may
+    win the race. A failure is ignored when `created_elsewhere()` shows the
+    object exists after all.
+    """
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(ddl)
+    except SQLAlchemyError:
+        if not created_elsewhere():
+            raise
+        log.info("%s was created concurrently by another process", what)
+
+
+def _add_missing_columns() -> None:
+    dialect = db.engine.dialect
+    # Postgres can skip an existing column itself; elsewhere the check below
+    # and _execute_ddl's recovery have to do.
+    if_not_exists = " IF NOT EXISTS" if dialect.name == "postgresql" else ""
+    for column in _ADDED_COLUMNS:
+        table = column.table.name
+        if _column_exists(table, column.name):
+            continue
+        ddl_type = column.type.compile(dialect=dialect)
+        _execute_ddl(
+            text(f"ALTER TABLE {table} ADD COLUMN{if_not_exists} {column.name} {ddl_type}"),
+            lambda: _column_exists(table, column.name),
+            f"column {table}.{column.name}",
+        )
+
+
+def _create_missing_indexes() -> None:
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            _execute_ddl(
+                CreateIndex(index, if_not_exists=True),
+                lambda: _index_exists(table.name, index.name),
+                f"index {index.name}",
+            )
+
+
+def _create_trigram_indexes() -> None:
+    """Create pg_trgm GIN indexes backing the "local_fuzzy" matching tier.
+
+    Postgres only; SQLite uses the in-process fallback in importer.search.
+    Creating the extension needs elevated privileges on some hosts, so a
+    failure here only disables fuzzy matching instead of aborting startup.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_movies_match_key_trgm ON movies USING gin (match_key gin_trgm_ops)")
+            )
+            conn.execute(
+                text("CREATE INDEX IF NOT EXISTS ix_tv_shows_match_key_trgm ON tv_shows USING gin (match_key gin_trgm_ops)")
+            )
+    except SQLAlchemyError as exc:
+        log.warning("pg_trgm unavailable, local fuzzy matching disabled: %s", exc)
+
+
+def backfill_match_keys(batch_size: int = 1000, rebuild: bool = False) -> int:
+    """Populate movies.match_key / tv_shows.match_key from title/name.
+
+    Only rows without a key are touched unless `rebuild` is set, which is
+    needed after normalize_match_key changes. Returns the number of rows
+    updated.
+    """
+    updated = 0
+    for model, source in ((Movie, "title"), (TVShow, "name")):
+        last_id = 0
+        while True:
+            query = model.query.filter(model.id > last_id)
+            if not rebuild:
+                query = query.filter(model.match_key.is_(None))
+            rows = query.order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            for row in rows:
+                key = normalize_match_key(getattr(row, source)) or None
+                if row.match_key != key:
+                    row.match_key = key
+                    updated += 1
+            last_id = rows[-1].id
+            db.session.commit()
+    return updated
+
+
+_MATCH_KEY_VERSION_SETTING = "match_key_version"
+
+
+def sync_match_keys() -> int:
+    """Bring stored match keys in line with normalize_match_key.
+
+    Missing keys are backfilled. If the keys were computed by another
+    MATCH_KEY_VERSION (or by a release that didn't record one), every key is
+    rebuilt, since changed keys would otherwise silently stop matching.
+    Returns the number of rows updated.
+    """
+    setting = db.session.get(AppSetting, _MATCH_KEY_VERSION_SETTING)
+    if setting is not None and setting.value == str(MATCH_KEY_VERSION):
+        return backfill_match_keys()
+
+    log.info(
+        "Match key version changed (%s -> %s); rebuilding catalog keys",
+        setting.value if setting else "unknown",
+        MATCH_KEY_VERSION,
+    )
+    updated = backfill_match_keys(rebuild=True)
+    try:
+        db.session.merge(AppSetting(key=_MATCH_KEY_VERSION_SETTING, value=str(MATCH_KEY_VERSION)))
+        db.session.commit()
+    except IntegrityError:
+        # Another process starting up at the same time recorded it first
+        db.session.rollback()
+    log.info("Rebuilt %d catalog match keys", updated)
+    return updated
+
+
+def upgrade_schema() -> None:
+    """Apply additive schema changes that db.create_all() cannot (idempotent)."""
+    _add_missing_columns()
+    _create_missing_indexes()
+    _create_trigram_indexes()
+    sync_match_keys()
@@ -1,69 +1,213 @@
 from __future__ import annotations
 
+import io
+import logging
+import os
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+from typing import Iterable, Iterator
 from uuid import UUID
 
 from celery import shared_task
 
+from app import blob_store
+from app.blob_store import BlobNotFoundError
 from app.extensions import db, socketio
-from app.models import ImportSession, ExtractedTitle
-from app.importer.parsing import extract_titles_from_text
-from app.importer.search import find_matches_for_extracted_title
+from app.models import ImportSession, ExtractedTitle, TitleMatch
+from app.importer.parsing import (
+    ColumnMap,
+    ExtractedTitleRecord,
+    iter_titles_from_file,
+    iter_titles_from_table,
+    iter_titles_from_text,
+)
+from app.importer.search import (
+    TitleGroupKey,
+    copy_matches,
+    group_duplicate_titles,
+    iter_matches_for_extracted_titles,
+)
+from app.tmdb_client import get_stats as get_tmdb_stats
+
+
+log = logging.getLogger(__name__)
+
+# Records parsed, matched and committed together. Bounds worker memory and
+# lets matching start long before a big upload is fully parsed.
+_IMPORT_CHUNK_SIZE = 500
+
+
+def _chunks(records: Iterable[ExtractedTitleRecord], size: int) -> Iterator[list[ExtractedTitleRecord]]:
+    it = iter(records)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def _emit_progress(import_id: str, processed: int, total: int | None, matched: int) -> None:
+    # Emit progress update via Socket.IO (using Redis message queue)
+    try:
+        socketio.emit(
+            "import_progress",
+            {
+                "importId": import_id,
+                "processed": processed,
+                "total": total,
+                "matched": matched,
+            },
+            namespace="/imports",
+        )
+    except Exception:
+        # Avoid crashing the worker due to transient socket errors
+        pass
+
+
+def _iter_records(file_text: str, filename: str | None, column_map: ColumnMap | None) -> Iterator[ExtractedTitleRecord]:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in {".csv", ".tsv"}:
+        return iter_titles_from_table(io.BytesIO(file_text.encode("utf-8")), ext, column_map)
+    return iter_titles_from_text(file_text)
+
+
+@contextmanager
+def _open_records(
+    file_text: str | None,
+    blob_ref: str | None,
+    file_format: str | None,
+    filename: str | None,
+    column_map: ColumnMap | None,
+) -> Iterator[Iterator[ExtractedTitleRecord]]:
+    if blob_ref is None:
+        yield _iter_records(file_text or "", filename, column_map)
+        return
+    ext = file_format or os.path.splitext(filename or "")[1]
+    with blob_store.local_path(blob_ref) as path:
+        yield iter_titles_from_file(path, column_map, ext=ext)
 
 
 @shared_task(name="tasks.process_import_file")
-def process_import_file(import_id: str, file_text: str, list_type: str | None, user_id: str | None) -> None:
+def process_import_file(
+    import_id: str,
+    file_text: str | None,
+    list_type: str | None,
+    user_id: str | None,
+    column_map: ColumnMap | None = None,
+    blob_ref: str | None = None,
+    file_format: str | None = None,
+) -> None:
     """Background job: parse the uploaded file and populate matches.
 
-    This version only uses local DB search; TMDB API fallback and list updates
-    can be added in follow-up iterations.
+    Titles are parsed lazily and handled _IMPORT_CHUNK_SIZE at a time: each
+    chunk is stored, matched and committed before the next is parsed, so
+    the total is only known at the end (progress events carry total=None
+    until then). Repeated titles (one line per episode in watch histories)
+    are matched once per title_group_key, across chunks; duplicates get
+    copies of the matches.
+
+    The upload arrives either as `blob_ref`, a reference into app.blob_store
+    (removed once the import completes), read with the extractor for
+    `file_format` (its extension, e.g. ".pdf"); or, from older callers, as
+    decoded `file_text`. Tables (CSV/TSV/Excel) are read by column;
+    `column_map` ({"title": ..., "year": ...}) overrides the detected
+    header names. An upload that can't be read or parsed marks the session
+    failed and its blob is removed.
     """
     session = ImportSession.query.get(UUID(import_id))
     if not session:
         return
 
+    session_id = session.id
     session.status = "processing"
     db.session.commit()
 
-    records = extract_titles_from_text(file_text or "")
-
-    total = len(records)
+    # Group key -> detached copies of the matches found for it
+    resolved: dict[TitleGroupKey, list[TitleMatch]] = {}
+    total = 0
     matched = 0
 
-    for idx, rec in enumerate(records, start=1):
-        extracted = ExtractedTitle(
-            import_session=session,
-            raw_text=rec.raw_text,
-            normalized_title=rec.normalized_title,
-            year=rec.year,
-        )
-        db.session.add(extracted)
-        db.session.flush()  # assign id
-
-        matches = find_matches_for_extracted_title(extracted)
-        for m in matches:
-            db.session.add(m)
-
-        if matches:
-            matched += 1
-
-        # Emit progress update via Socket.IO (using Redis message queue)
-        try:
-            socketio.emit(
-                "import_progress",
-                {
-                    "importId": import_id,
-                    "processed": idx,
-                    "total": total,
-                    "matched": matched,
-                },
-                namespace="/imports",
-            )
-        except Exception:
-            # Avoid crashing the worker due to transient socket errors
-            pass
+    try:
+        with ExitStack() as stack:
+            try:
+                records = stack.enter_context(
+                    _open_records(file_text, blob_ref, file_format, session.original_filename, column_map)
+                )
+            except BlobNotFoundError:
+                log.error("Import %s failed: uploaded file %s is no longer available", import_id, blob_ref)
+                session.status = "failed"
+                db.session.commit()
+                return
+
+            for chunk in _chunks(records, _IMPORT_CHUNK_SIZE):
+                extracted_titles = [
+                    ExtractedTitle(
+                        import_id=session_id,
+                        raw_text=rec.raw_text,
+                        normalized_title=rec.normalized_title,
+                        year=rec.year,
+                        media_hint=rec.media_hint,
+                    )
+                    for rec in chunk
+                ]
+                db.session.add_all(extracted_titles)
+                db.session.flush()  # assign ids
+
+                groups = group_duplicate_titles(extracted_titles)
+                new_keys = []
+                for key, group in groups.items():
+                    templates = resolved.get(key)
+                    if templates is None:
+                        new_keys.append(key)
+                        continue
+                    for idx in group:
+                        db.session.add_all(copy_matches(templates, extracted_titles[idx]))
+                    total += len(group)
+                    if templates:
+                        matched += len(group)
+                representatives = [extracted_titles[groups[key][0]] for key in new_keys]
 
+                # Local exact matches are resolved up front with a few set-based
+                # queries; TMDB lookups for the remaining titles run concurrently,
+                # while every DB write stays on this thread.
+                for rep_idx, matches in iter_matches_for_extracted_titles(representatives):
+                    key = new_keys[rep_idx]
+                    group = groups[key]
+                    db.session.add_all(matches)
+                    for dup_idx in group[1:]:
+                        db.session.add_all(copy_matches(matches, extracted_titles[dup_idx]))
+                    resolved[key] = copy_matches(matches, None)
+
+                    total += len(group)
+                    if matches:
+                        matched += len(group)
+                    _emit_progress(import_id, total, None, matched)
+
+                db.session.commit()
+    except Exception:
+        # A corrupt or unreadable upload: don't leave the session processing
+        # (and its blob stored) forever.
+        log.exception("Import %s failed while parsing or matching", import_id)
+        db.session.rollback()
+        db.session.get(ImportSession, session_id).status = "failed"
+        db.session.commit()
+        if blob_ref:
+            blob_store.delete(blob_ref)
+        return
+
+    session = db.session.get(ImportSession, session_id)
     session.total_titles = total
     session.matched_count = matched
     session.unmatched_count = total - matched
+    session.unique_titles = len(resolved)
     session.status = "completed"
     db.session.commit()
+    _emit_progress(import_id, total, total, matched)
+    if blob_ref:
+        blob_store.delete(blob_ref)
+
+    log.info(
+        "Import %s completed (%d/%d matched, %d unique titles); TMDB client stats: %s",
+        import_id,
+        matched,
+        total,
+        len(resolved),
+        get_tmdb_stats(),
+    )
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+
+from app.tmdb_client import TMDBUnavailableError, refresh_search
+
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name="tasks.refresh_tmdb_search")
+def refresh_tmdb_search(kind: str, title: str, year: int | None) -> None:
+    """Background job: re-fetch a stale TMDB search cache entry.
+
+    If TMDB is unavailable the stale entry keeps being served until its
+    grace window runs out.
+    """
+    try:
+        refresh_search(kind, title, year)
+    except TMDBUnavailableError:
+        log.info("TMDB unavailable, leaving stale %s search for %r", kind, title)
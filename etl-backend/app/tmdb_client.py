@@ -1,20 +1,218 @@
 from __future__ import annotations
 
+import json
+import logging
+import math
 import os
+import random
+import struct
+import threading
 import time
-from typing import Any
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Sequence
 
 import redis
 import requests
+from requests.adapters import HTTPAdapter
 
+from .circuit_breaker import CircuitBreaker
 from .config import Config
+from .local_cache import LocalTTLCache
+from .normalize import normalize_match_key
+from .rate_limit import TokenBucket
 
 
-_cfg = Config()
-_redis = redis.from_url(_cfg.REDIS_URL) if _cfg.REDIS_URL else None
+log = logging.getLogger(__name__)
 
 _TMDB_BASE_URL = "https://api.themoviedb.org/3"
 _CACHE_TTL_SECONDS = 24 * 60 * 60
+_REFRESH_DEDUPE_SECONDS = 60
+
+# Per-process state, created lazily on first use (importing this module must
+# stay cheap: create_app imports it in every web process and worker) and
+# dropped after fork so prefork children never share the parent's sockets.
+_config: Config | None = None
+_redis_client: redis.Redis | None = None
+_redis_initialized = False
+# Reentrant: the lazy getters it guards call each other (_get_circuit needs
+# _get_redis).
+_init_lock = threading.RLock()
+
+# Hot search results kept in-process in front of Redis, keyed by _cache_key.
+_local_cache: LocalTTLCache | None = None
+
+# Negative cache entries: TMDB knew nothing about the query, or the lookup
+# failed. Both are cached (with their own, shorter TTLs) so junk lines and
+# unknown titles don't burn rate-limit budget on every import.
+_NEGATIVE_EMPTY = "empty"
+_NEGATIVE_ERROR = "error"
+
+# Search cache counters for this process (the in-process layer keeps its own).
+_cache_counters = {
+    "redis_hits": 0,
+    "stale_hits": 0,
+    "refreshes_enqueued": 0,
+    "coalesced_hits": 0,
+    "single_flight_timeouts": 0,
+    "tmdb_fetches": 0,
+    "tmdb_retries": 0,
+    "negative_hits_empty": 0,
+    "negative_hits_error": 0,
+}
+_cache_counters_lock = threading.Lock()
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+_circuit: CircuitBreaker | None = None
+
+
+def _reset_after_fork() -> None:
+    # Celery prefork children must not share the parent's keep-alive sockets;
+    # drop the inherited config, Redis client, session and limiters (and locks
+    # that may have been held at fork time) so the child builds its own on
+    # first use. The local cache resets itself (see local_cache).
+    global _config, _redis_client, _redis_initialized, _init_lock
+    global _session, _session_lock, _buckets, _buckets_lock, _cache_counters_lock, _circuit
+    _config = None
+    _redis_client = None
+    _redis_initialized = False
+    _init_lock = threading.RLock()
+    _session = None
+    _session_lock = threading.Lock()
+    _buckets = {}
+    _buckets_lock = threading.Lock()
+    _cache_counters_lock = threading.Lock()
+    for name in _cache_counters:
+        _cache_counters[name] = 0
+    _circuit = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_config() -> Config:
+    global _config
+    if _config is None:
+        _config = Config()
+    return _config
+
+
+def _get_redis() -> redis.Redis | None:
+    """This process's Redis client, or None when REDIS_URL is unset.
+
+    Backed by an explicit connection pool that pings idle connections before
+    reuse (REDIS_HEALTH_CHECK_INTERVAL), so a worker that sat idle behind a
+    proxy doesn't fail its first command on a dead socket.
+    """
+    global _redis_client, _redis_initialized
+    if _redis_initialized:
+        return _redis_client
+    with _init_lock:
+        if not _redis_initialized:
+            cfg = _get_config()
+            if cfg.REDIS_URL:
+                pool = redis.ConnectionPool.from_url(
+                    cfg.REDIS_URL,
+                    max_connections=cfg.REDIS_MAX_CONNECTIONS,
+                    health_check_interval=cfg.REDIS_HEALTH_CHECK_INTERVAL,
+                    socket_connect_timeout=cfg.REDIS_SOCKET_TIMEOUT,
+                    socket_timeout=cfg.REDIS_SOCKET_TIMEOUT,
+                    socket_keepalive=True,
+                )
+                _redis_client = redis.Redis(connection_pool=pool)
+            _redis_initialized = True
+    return _redis_client
+
+
+def _get_local_cache() -> LocalTTLCache:
+    global _local_cache
+    if _local_cache is None:
+        with _init_lock:
+            if _local_cache is None:
+                cfg = _get_config()
+                _local_cache = LocalTTLCache(
+                    max_entries=cfg.TMDB_LOCAL_CACHE_MAX_ENTRIES,
+                    max_bytes=cfg.TMDB_LOCAL_CACHE_MAX_BYTES,
+                    ttl_seconds=cfg.TMDB_LOCAL_CACHE_TTL_SECONDS,
+                )
+    return _local_cache
+
+
+def _http_session() -> requests.Session:
+    """Process-wide keep-alive session used for every TMDB request.
+
+    Reusing pooled connections saves a TCP+TLS handshake per lookup. The
+    session is created lazily and is safe to share between threads.
+    """
+    global _session
+    session = _session
+    if session is not None:
+        return session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            cfg = _get_config()
+            adapter = HTTPAdapter(
+                pool_connections=cfg.TMDB_HTTP_POOL_CONNECTIONS,
+                pool_maxsize=cfg.TMDB_HTTP_POOL_MAXSIZE,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def http_pool_stats() -> dict[str, int]:
+    """Connection reuse counters for this process's TMDB session.
+
+    `pool_misses` counts new connections opened, `pool_hits` requests that
+    reused an existing keep-alive connection.
+    """
+    total_requests = 0
+    new_connections = 0
+    session = _session
+    if session is not None:
+        for adapter in {id(a): a for a in session.adapters.values()}.values():
+            if not isinstance(adapter, HTTPAdapter):
+                continue
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                total_requests += pool.num_requests
+                new_connections += pool.num_connections
+    return {
+        "requests": total_requests,
+        "pool_hits": max(total_requests - new_connections, 0),
+        "pool_misses": new_connections,
+    }
+
+
+def get_stats() -> dict[str, Any]:
+    """Per-process TMDB client counters, for health checks and logs."""
+    with _cache_counters_lock:
+        cache = dict(_cache_counters)
+    return {
+        "pid": os.getpid(),
+        "search_mode": _get_config().TMDB_SEARCH_MODE,
+        "http": http_pool_stats(),
+        "local_cache": _get_local_cache().stats(),
+        "cache": cache,
+    }
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _cache_counters_lock:
+        _cache_counters[name] += amount
 
 
 def _cache_key(prefix: str, **parts: Any) -> str:
@@ -22,63 +220,618 @@ def _cache_key(prefix: str, **parts: Any) -> str:
     return f"showbuff:{prefix}:{items}"
 
 
-def _rate_limit(bucket: str, limit_per_sec: int = 5) -> None:
-    """Very small Redis-based rate limiter.
+def _bucket_settings(bucket: str) -> tuple[float, int]:
+    """(rate per second, burst) for `bucket`, honouring TMDB_RATE_LIMITS."""
+    cfg = _get_config()
+    for item in cfg.TMDB_RATE_LIMITS.split(","):
+        name, _, spec = item.strip().partition("=")
+        if name != bucket or not spec:
+            continue
+        rate, _, burst = spec.partition(":")
+        try:
+            return float(rate), int(burst or cfg.TMDB_RATE_LIMIT_BURST)
+        except ValueError:
+            break
+    return cfg.TMDB_RATE_LIMIT_PER_SEC, cfg.TMDB_RATE_LIMIT_BURST
+
 
-    We stay well below TMDB's 50 req/sec by default. Per-process limiter,
-    combined with Railway's limited replicas, keeps us safe.
+def get_rate_limiter(bucket: str) -> TokenBucket:
+    """Token bucket for `bucket`, shared by every process using our Redis.
+
+    Callers that would rather skip work than wait can use try_acquire().
     """
-    if not _redis:
+    limiter = _buckets.get(bucket)
+    if limiter is not None:
+        return limiter
+    with _buckets_lock:
+        if bucket not in _buckets:
+            rate, burst = _bucket_settings(bucket)
+            _buckets[bucket] = TokenBucket(bucket, rate, burst, _get_redis())
+        return _buckets[bucket]
+
+
+def _rate_limit(bucket: str) -> None:
+    """Block until the bucket grants a token for one TMDB request."""
+    get_rate_limiter(bucket).acquire()
+
+
+def _retry_after_seconds(resp: requests.Response, default: float) -> float:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _record_rate_limit_feedback(bucket: str, resp: requests.Response) -> None:
+    """Adapt the shared bucket to what TMDB tells us.
+
+    A 429 halves the bucket's rate and pauses it for Retry-After. If TMDB
+    reports an exhausted X-RateLimit-Remaining, pause until X-RateLimit-Reset
+    without lowering the rate.
+    """
+    limiter = get_rate_limiter(bucket)
+    if resp.status_code == 429:
+        limiter.throttle(_retry_after_seconds(resp, default=1.0))
+        return
+
+    remaining = resp.headers.get("X-RateLimit-Remaining")
+    reset = resp.headers.get("X-RateLimit-Reset")
+    if remaining is None or reset is None:
         return
-    key = f"ratelimit:{bucket}:{int(time.time())}"
-    count = _redis.incr(key)
-    if count == 1:
-        _redis.expire(key, 1)
-    if count > limit_per_sec:
-        time.sleep(0.2)
+    try:
+        if int(remaining) > 0:
+            return
+        pause = float(reset) - time.time()
+    except ValueError:
+        return
+    if pause > 0:
+        limiter.throttle(pause, factor=1.0)
+
+
+# media type -> (endpoint path, cache prefix, rate limit bucket)
+_SEARCH_ENDPOINTS: dict[str, tuple[str, str, str]] = {
+    "movie": ("/search/movie", "tmdb_search_movie", "tmdb_search_movie"),
+    "tv": ("/search/tv", "tmdb_search_tv", "tmdb_search_tv"),
+    # One call returning both movies and TV; it has no year filter, so the
+    # cache key is title-only and the year is applied when splitting.
+    "multi": ("/search/multi", "tmdb_search_multi", "tmdb_search_multi"),
+}
+
+
+def _use_multi_search() -> bool:
+    return _get_config().TMDB_SEARCH_MODE == "multi"
+
+
+def _split_multi(results: list[dict[str, Any]], media_type: str, year: int | None) -> list[dict[str, Any]]:
+    """Pick `media_type` results (optionally from `year`) out of a /search/multi response."""
+    date_field = "release_date" if media_type == "movie" else "first_air_date"
+    picked = [r for r in results if r.get("media_type") == media_type]
+    if year:
+        picked = [r for r in picked if (r.get(date_field) or "")[:4] == str(year)]
+    return picked
+
+
+def _search_cache_key(cache_prefix: str, title: str, year: int | None) -> str:
+    # Spelling variants of one title ("Matrix, The", "the  matrix.") share an
+    # entry; titles that are all punctuation keep their literal form.
+    key = normalize_match_key(title) or title.casefold()
+    return _cache_key(cache_prefix, title=key, year=year or "*")
+
+
+@dataclass(frozen=True)
+class _CacheEntry:
+    """A cached search outcome: TMDB results, or a negative marker."""
+
+    results: list[dict[str, Any]]
+    negative: str | None = None  # _NEGATIVE_EMPTY / _NEGATIVE_ERROR
+    fetched_at: float | None = None  # unix time; None for legacy entries
+
+
+def _fresh_ttl(entry: _CacheEntry) -> int:
+    if entry.negative == _NEGATIVE_ERROR:
+        return _get_config().TMDB_ERROR_CACHE_TTL_SECONDS
+    if entry.negative == _NEGATIVE_EMPTY:
+        return _get_config().TMDB_EMPTY_CACHE_TTL_SECONDS
+    return _CACHE_TTL_SECONDS
+
+
+def _redis_ttl(entry: _CacheEntry) -> int:
+    # Keep entries past their freshness for the stale-while-revalidate grace
+    # window; failed lookups are never served stale.
+    if entry.negative == _NEGATIVE_ERROR:
+        return _fresh_ttl(entry)
+    return _fresh_ttl(entry) + _get_config().TMDB_CACHE_STALE_GRACE_SECONDS
+
+
+def _age(entry: _CacheEntry) -> float:
+    return 0.0 if entry.fetched_at is None else max(time.time() - entry.fetched_at, 0.0)
+
+
+def _is_stale(entry: _CacheEntry) -> bool:
+    return _age(entry) > _fresh_ttl(entry)
+
+
+def _decode_servable(raw: bytes | None) -> _CacheEntry | None:
+    """Decode a Redis value, treating a stale failed lookup as a miss.
+
+    Error entries expire from Redis when they go stale, but one read right
+    at that moment must not be served while TMDB is retried in the
+    background; it is simply fetched again.
+    """
+    entry = _decode_cached(raw)
+    if entry is not None and entry.negative == _NEGATIVE_ERROR and _is_stale(entry):
+        return None
+    return entry
+
+
+# Cached search values are a binary header followed by the result rows:
+#
+#   version (u8) | flags (u8) | fetched_at (f64, NaN if unknown) | body
+#
+# The body is a JSON list of positional rows, one value per _CACHED_FIELDS
+# entry, zlib-compressed (flag bit 0) once it reaches
+# TMDB_CACHE_COMPRESS_MIN_BYTES. Negative entries carry no body, only their
+# flag. Bump _CACHE_FORMAT_VERSION whenever the layout or field list changes;
+# values with an unknown version are treated as misses. Values written before
+# this format (plain JSON, starting with "[" or "{") are still read.
+_CACHE_FORMAT_VERSION = 1
+_CACHE_HEADER = struct.Struct("!BBd")
+_FLAG_ZLIB = 0x01
+_NEGATIVE_FLAGS = {_NEGATIVE_EMPTY: 0x02, _NEGATIVE_ERROR: 0x04}
+
+# The only TMDB result fields the matcher reads (plus poster_path).
+_CACHED_FIELDS = (
+    "id",
+    "media_type",
+    "title",
+    "name",
+    "original_title",
+    "original_name",
+    "release_date",
+    "first_air_date",
+    "popularity",
+    "adult",
+    "poster_path",
+)
+
+
+def _project(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [{f: r[f] for f in _CACHED_FIELDS if r.get(f) is not None} for r in results]
+
+
+def _encode_entry(entry: _CacheEntry) -> bytes:
+    fetched_at = math.nan if entry.fetched_at is None else entry.fetched_at
+    if entry.negative:
+        return _CACHE_HEADER.pack(_CACHE_FORMAT_VERSION, _NEGATIVE_FLAGS[entry.negative], fetched_at)
 
+    rows = [[r.get(f) for f in _CACHED_FIELDS] for r in entry.results]
+    body = json.dumps(rows, separators=(",", ":")).encode()
+    flags = 0
+    if len(body) >= _get_config().TMDB_CACHE_COMPRESS_MIN_BYTES:
+        body = zlib.compress(body)
+        flags |= _FLAG_ZLIB
+    return _CACHE_HEADER.pack(_CACHE_FORMAT_VERSION, flags, fetched_at) + body
 
-def _search_tmdb(endpoint: str, cache_prefix: str, bucket: str, title: str, year: int | None) -> list[dict[str, Any]]:
+
+def _decode_legacy(raw: bytes) -> _CacheEntry | None:
+    data = json.loads(raw)
+    if isinstance(data, list):
+        # Bare result list written before entries carried a timestamp.
+        return _CacheEntry(results=_project(data))
+    if not isinstance(data, dict):
+        return None
+    negative = data.get("n", data.get("negative"))
+    if negative in _NEGATIVE_FLAGS:
+        return _CacheEntry(results=[], negative=negative, fetched_at=data.get("t"))
+    if isinstance(data.get("r"), list):
+        return _CacheEntry(results=_project(data["r"]), fetched_at=data.get("t"))
+    return None
+
+
+def _decode_cached(raw: bytes | None) -> _CacheEntry | None:
+    if not raw:
+        return None
+    try:
+        if raw[:1] in (b"[", b"{"):
+            return _decode_legacy(raw)
+        version, flags, fetched_at = _CACHE_HEADER.unpack_from(raw)
+        if version != _CACHE_FORMAT_VERSION:
+            return None
+        fetched_at = None if math.isnan(fetched_at) else fetched_at
+        for negative, flag in _NEGATIVE_FLAGS.items():
+            if flags & flag:
+                return _CacheEntry(results=[], negative=negative, fetched_at=fetched_at)
+        body = raw[_CACHE_HEADER.size :]
+        if flags & _FLAG_ZLIB:
+            body = zlib.decompress(body)
+        results = [
+            {f: v for f, v in zip(_CACHED_FIELDS, row) if v is not None} for row in json.loads(body)
+        ]
+    except Exception:
+        return None
+    return _CacheEntry(results=results, fetched_at=fetched_at)
+
+
+def _entry_from_fetch(results: list[dict[str, Any]] | None) -> _CacheEntry:
+    now = time.time()
+    if results is None:
+        return _CacheEntry(results=[], negative=_NEGATIVE_ERROR, fetched_at=now)
+    if not results:
+        return _CacheEntry(results=[], negative=_NEGATIVE_EMPTY, fetched_at=now)
+    return _CacheEntry(results=_project(results), fetched_at=now)
+
+
+def _cache_locally(key: str, entry: _CacheEntry, size: int) -> None:
+    # Only fresh entries, and never beyond their freshness; stale ones keep
+    # coming from Redis until the background refresh replaces them.
+    remaining = _fresh_ttl(entry) - _age(entry)
+    if remaining > 0:
+        _get_local_cache().set(key, entry, size, ttl_seconds=remaining)
+
+
+def _served(entry: _CacheEntry) -> list[dict[str, Any]]:
+    """Results for a cache hit, counting negative hits by kind."""
+    if entry.negative:
+        _count(f"negative_hits_{entry.negative}")
+    return entry.results
+
+
+def _served_from_redis(
+    key: str, entry: _CacheEntry, size: int, kind: str, title: str, year: int | None
+) -> list[dict[str, Any]]:
+    """Results for a Redis hit. Fresh entries are promoted to the local
+    cache; stale ones (inside the grace window) are served as-is while a
+    background refresh is scheduled."""
+    _count("redis_hits")
+    if _is_stale(entry):
+        _count("stale_hits")
+        _schedule_refresh(key, kind, title, year)
+    else:
+        _cache_locally(key, entry, size)
+    return _served(entry)
+
+
+def _schedule_refresh(key: str, kind: str, title: str, year: int | None) -> None:
+    """Enqueue a background re-fetch of a stale entry (at most one per key
+    per _REFRESH_DEDUPE_SECONDS across all processes)."""
+    try:
+        if not _get_redis().set(f"{key}:refresh", "1", nx=True, ex=_REFRESH_DEDUPE_SECONDS):
+            return
+        # Import lazily: celery_app builds the Flask app, which imports us.
+        from celery_app import celery
+
+        celery.send_task("tasks.refresh_tmdb_search", args=[kind, title, year])
+        _count("refreshes_enqueued")
+    except Exception as exc:  # pragma: no cover - broker/redis issues
+        log.warning("Could not schedule refresh of %s: %s", key, exc)
+
+
+class TMDBUnavailableError(RuntimeError):
+    """TMDB is failing and the circuit breaker is open; callers should fall
+    back to local-only matching instead of waiting on timeouts."""
+
+
+def _get_circuit() -> CircuitBreaker:
+    global _circuit
+    if _circuit is None:
+        with _init_lock:
+            if _circuit is None:
+                cfg = _get_config()
+                _circuit = CircuitBreaker(
+                    "tmdb",
+                    threshold=cfg.TMDB_CIRCUIT_FAILURE_THRESHOLD,
+                    window_seconds=cfg.TMDB_CIRCUIT_WINDOW_SECONDS,
+                    cooldown_seconds=cfg.TMDB_CIRCUIT_COOLDOWN_SECONDS,
+                    redis_client=_get_redis(),
+                )
+    return _circuit
+
+
+def _backoff_seconds(attempt: int) -> float:
+    # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+    cfg = _get_config()
+    return random.uniform(0, min(cfg.TMDB_RETRY_BACKOFF_MAX, cfg.TMDB_RETRY_BACKOFF_BASE * (2**attempt)))
+
+
+def _fetch_tmdb(endpoint: str, bucket: str, title: str, year: int | None) -> list[dict[str, Any]] | None:
+    """Rate-limited HTTP call to a TMDB search endpoint, with retries.
+
+    Network errors and 5xx responses are retried up to TMDB_MAX_RETRIES
+    times with jittered exponential backoff and count towards the shared
+    circuit breaker; 429s are retried after Retry-After (the rate limiter
+    enforces the pause for every process). Returns the `results` list, or
+    None when the lookup failed. Raises TMDBUnavailableError while the
+    circuit is open.
+    """
+    cfg = _get_config()
+    circuit = _get_circuit()
+    params: dict[str, Any] = {"api_key": cfg.TMDB_API_KEY, "query": title}
+    if year:
+        params["year"] = year
+
+    for attempt in range(cfg.TMDB_MAX_RETRIES + 1):
+        if circuit.is_open():
+            raise TMDBUnavailableError("TMDB circuit breaker is open")
+
+        _rate_limit(bucket)
+        _count("tmdb_fetches")
+        retry_in = _backoff_seconds(attempt)
+        try:
+            resp = _http_session().get(
+                f"{_TMDB_BASE_URL}{endpoint}",
+                params=params,
+                timeout=(cfg.TMDB_HTTP_CONNECT_TIMEOUT, cfg.TMDB_HTTP_READ_TIMEOUT),
+            )
+        except requests.RequestException as exc:
+            log.warning("TMDB %s request failed for %r (attempt %d): %s", endpoint, title, attempt + 1, exc)
+            circuit.record_failure()
+        else:
+            _record_rate_limit_feedback(bucket, resp)
+            if resp.ok:
+                try:
+                    return resp.json().get("results", [])
+                except ValueError:
+                    return None
+            if resp.status_code == 429:
+                retry_after = _retry_after_seconds(resp, default=1.0)
+                if retry_after > cfg.TMDB_RETRY_BACKOFF_MAX:
+                    return None
+                # _rate_limit() on the next attempt waits out Retry-After.
+                retry_in = 0.0
+            elif resp.status_code >= 500:
+                circuit.record_failure()
+            else:
+                # Other 4xx (bad key, bad query) won't succeed on retry.
+                return None
+
+        if attempt < cfg.TMDB_MAX_RETRIES:
+            _count("tmdb_retries")
+            time.sleep(retry_in)
+
+    return None
+
+
+# Compare-and-delete so a leader never releases a lock that expired and was
+# taken over by another process.
+_RELEASE_LOCK_LUA = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+  return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def _release_lock(pipe: redis.client.Pipeline, cache_key: str, token: str) -> None:
+    pipe.eval(_RELEASE_LOCK_LUA, 1, _lock_key(cache_key), token)
+
+
+# A pending TMDB fetch: cache key -> (search kind, title, year), where the
+# kind is a _SEARCH_ENDPOINTS key.
+_Fetches = dict[str, tuple[str, str, int | None]]
+
+
+def _lock_key(cache_key: str) -> str:
+    return f"{cache_key}:lock"
+
+
+def _store_fetched(key: str, data: list[dict[str, Any]] | None, lock_token: str | None = None) -> _CacheEntry:
+    """Cache freshly fetched results locally and in Redis, releasing our
+    single-flight lock in the same round trip."""
+    entry = _entry_from_fetch(data)
+    payload = _encode_entry(entry)
+    _cache_locally(key, entry, len(payload))
+    client = _get_redis()
+    if client:
+        pipe = client.pipeline(transaction=False)
+        pipe.setex(key, _redis_ttl(entry), payload)
+        if lock_token:
+            _release_lock(pipe, key, lock_token)
+        pipe.execute()
+    return entry
+
+
+def _fetch_all(
+    keys: list[str], wanted: _Fetches, max_workers: int, lock_token: str | None = None
+) -> dict[str, _CacheEntry]:
+    """Fetch `keys` from TMDB, storing each entry (and releasing its lock) as
+    soon as its own search is done, so followers elsewhere never wait on the
+    rest of a large batch."""
+
+    def _fetch(key: str) -> _CacheEntry:
+        kind, title, year = wanted[key]
+        endpoint, _, bucket = _SEARCH_ENDPOINTS[kind]
+        return _store_fetched(key, _fetch_tmdb(endpoint, bucket, title, year), lock_token)
+
+    if max_workers > 1 and len(keys) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tmdb-search") as pool:
+            return dict(zip(keys, pool.map(_fetch, keys)))
+    return {key: _fetch(key) for key in keys}
+
+
+def _await_leaders(keys: list[str]) -> dict[str, _CacheEntry]:
+    """Wait for other processes' in-flight fetches of `keys` to land in Redis.
+
+    Gives up on a key as soon as its lock disappears without a cache entry
+    (the leader failed) or when TMDB_SINGLE_FLIGHT_TIMEOUT_SECONDS elapses.
+    """
+    entries: dict[str, _CacheEntry] = {}
+    waiting = list(keys)
+    client = _get_redis()
+    deadline = time.monotonic() + _get_config().TMDB_SINGLE_FLIGHT_TIMEOUT_SECONDS
+    delay = 0.05
+    while waiting and time.monotonic() < deadline:
+        time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, 0.5)
+
+        pipe = client.pipeline(transaction=False)
+        pipe.mget(waiting)
+        pipe.mget([_lock_key(k) for k in waiting])
+        values, locks = pipe.execute()
+
+        still_waiting = []
+        for key, raw, lock in zip(waiting, values, locks):
+            entry = _decode_cached(raw)
+            if entry is not None:
+                _count("coalesced_hits")
+                _cache_locally(key, entry, len(raw))
+                entries[key] = entry
+            elif lock is not None:
+                still_waiting.append(key)
+        waiting = still_waiting
+
+    if waiting:
+        _count("single_flight_timeouts", len(waiting))
+    return entries
+
+
+def _resolve_misses(wanted: _Fetches, max_workers: int = 1) -> dict[str, _CacheEntry]:
+    """Fetch cache misses from TMDB with cross-process single-flight.
+
+    For each key we try to take a short Redis lock (all in one pipeline).
+    Keys we lead are fetched and each written back as soon as it arrives;
+    keys another process is already fetching are read from the cache once
+    that leader is done. If a leader fails or is too slow we fall back to
+    fetching the key ourselves.
+    Propagates TMDBUnavailableError when the circuit breaker is open.
+    """
+    keys = list(wanted)
+    client = _get_redis()
+    if not client:
+        return _fetch_all(keys, wanted, max_workers)
+
+    token = uuid.uuid4().hex
+    lock_ms = int(_get_config().TMDB_SINGLE_FLIGHT_TIMEOUT_SECONDS * 1000)
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.set(_lock_key(key), token, nx=True, px=lock_ms)
+    acquired = pipe.execute()
+
+    leading = [key for key, ok in zip(keys, acquired) if ok]
+    following = [key for key, ok in zip(keys, acquired) if not ok]
+
+    entries: dict[str, _CacheEntry] = {}
+    if leading:
+        try:
+            entries.update(_fetch_all(leading, wanted, max_workers, lock_token=token))
+        except TMDBUnavailableError:
+            # Let followers elsewhere stop waiting on us right away (locks of
+            # keys already stored are gone; releasing them again is a no-op).
+            pipe = client.pipeline(transaction=False)
+            for key in leading:
+                _release_lock(pipe, key, token)
+            pipe.execute()
+            raise
+    if following:
+        entries.update(_await_leaders(following))
+        leftovers = [key for key in following if key not in entries]
+        if leftovers:
+            entries.update(_fetch_all(leftovers, wanted, max_workers))
+    return entries
+
+
+def _search_tmdb(kind: str, title: str, year: int | None) -> list[dict[str, Any]]:
     """Low-level helper to query a TMDB search endpoint with caching.
 
-    `endpoint` is the path after the base URL, e.g. "/search/movie".
+    `kind` is a _SEARCH_ENDPOINTS key ("movie", "tv" or "multi").
     """
-    if not _cfg.TMDB_API_KEY:
+    if not _get_config().TMDB_API_KEY:
         return []
 
     title = (title or "").strip()
     if not title:
         return []
 
-    cache_key = _cache_key(cache_prefix, title=title.lower(), year=year or "*")
-    if _redis:
-        cached = _redis.get(cache_key)
-        if cached:
-            import json
+    cache_key = _search_cache_key(_SEARCH_ENDPOINTS[kind][1], title, year)
+    local = _get_local_cache().get(cache_key)
+    if local is not None:
+        return _served(local)
 
-            try:
-                return json.loads(cached)
-            except Exception:
-                pass
+    client = _get_redis()
+    if client:
+        cached = client.get(cache_key)
+        entry = _decode_servable(cached)
+        if entry is not None:
+            return _served_from_redis(cache_key, entry, len(cached), kind, title, year)
 
-    _rate_limit(bucket)
+    return _resolve_misses({cache_key: (kind, title, year)})[cache_key].results
 
-    params: dict[str, Any] = {"api_key": _cfg.TMDB_API_KEY, "query": title}
-    if year:
-        params["year"] = year
 
-    resp = requests.get(f"{_TMDB_BASE_URL}{endpoint}", params=params, timeout=10)
-    if not resp.ok:
-        return []
+def refresh_search(kind: str, title: str, year: int | None = None) -> None:
+    """Re-fetch one search from TMDB and overwrite its cache entry.
+
+    Run by the background task scheduled when a stale entry is served.
+    """
+    if not _get_config().TMDB_API_KEY:
+        return
+    cache_key = _search_cache_key(_SEARCH_ENDPOINTS[kind][1], title, year)
+    _get_local_cache().delete(cache_key)
+    _resolve_misses({cache_key: (kind, title, year)})
 
-    data = resp.json()
-    results = data.get("results", [])
 
-    if _redis:
-        import json
+def search_many(
+    queries: Sequence[tuple[str, int | None, str]], max_workers: int = 1
+) -> list[list[dict[str, Any]]]:
+    """Resolve many (title, year, media_type) searches in one batch.
 
-        _redis.setex(cache_key, _CACHE_TTL_SECONDS, json.dumps(results))
+    Cache keys are computed up front: the in-process cache is consulted
+    first, the remaining keys are fetched from Redis with a single MGET, and
+    only the misses go to TMDB (over up to `max_workers` threads, each still
+    rate limited, and coalesced with other processes fetching the same key).
+    New entries are written back in one pipeline. Returns one result list
+    per query, in order; duplicate queries are fetched once.
+    """
+    results: list[list[dict[str, Any]]] = [[] for _ in queries]
+    if not _get_config().TMDB_API_KEY:
+        return results
+
+    # The fetch behind each cache key, and the query positions it answers.
+    # For /search/multi keys we also remember which slice each position needs.
+    multi = _use_multi_search()
+    wanted: _Fetches = {}
+    positions: dict[str, list[tuple[int, str | None, int | None]]] = {}
+    for idx, (title, year, media_type) in enumerate(queries):
+        title = (title or "").strip()
+        if not title:
+            continue
+        if multi and media_type in ("movie", "tv"):
+            key = _search_cache_key(_SEARCH_ENDPOINTS["multi"][1], title, None)
+            wanted.setdefault(key, ("multi", title, None))
+            positions.setdefault(key, []).append((idx, media_type, year))
+            continue
+        key = _search_cache_key(_SEARCH_ENDPOINTS[media_type][1], title, year)
+        wanted.setdefault(key, (media_type, title, year))
+        positions.setdefault(key, []).append((idx, None, None))
+
+    resolved: dict[str, list[dict[str, Any]]] = {}
+    for key in wanted:
+        local = _get_local_cache().get(key)
+        if local is not None:
+            resolved[key] = _served(local)
+
+    remote_keys = [key for key in wanted if key not in resolved]
+    client = _get_redis()
+    if client and remote_keys:
+        for key, raw in zip(remote_keys, client.mget(remote_keys)):
+            entry = _decode_servable(raw)
+            if entry is not None:
+                resolved[key] = _served_from_redis(key, entry, len(raw), *wanted[key])
+
+    misses = {key: wanted[key] for key in wanted if key not in resolved}
+    if misses:
+        for key, entry in _resolve_misses(misses, max_workers).items():
+            resolved[key] = entry.results
 
+    for key, slots in positions.items():
+        for idx, split_type, split_year in slots:
+            found = resolved.get(key, [])
+            results[idx] = _split_multi(found, split_type, split_year) if split_type else found
     return results
 
 
@@ -87,12 +840,26 @@ def search_tmdb_movies(title: str, year: int | None = None) -> list[dict[str, An
 
     This is the main function used for movie matching.
     """
-    return _search_tmdb("/search/movie", "tmdb_search_movie", "tmdb_search_movie", title, year)
+    return _search_tmdb("movie", title, year)
 
 
 def search_tmdb_tv(title: str, year: int | None = None) -> list[dict[str, Any]]:
     """Search TMDB TV shows by title/year."""
-    return _search_tmdb("/search/tv", "tmdb_search_tv", "tmdb_search_tv", title, year)
+    return _search_tmdb("tv", title, year)
+
+
+def search_tmdb_movies_and_tv(
+    title: str, year: int | None = None
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Search TMDB movies and TV shows for one title.
+
+    Uses one /search/multi call when TMDB_SEARCH_MODE is "multi", otherwise
+    the separate movie and TV endpoints.
+    """
+    if _use_multi_search():
+        results = _search_tmdb("multi", title, None)
+        return _split_multi(results, "movie", year), _split_multi(results, "tv", year)
+    return search_tmdb_movies(title, year), search_tmdb_tv(title, year)
 
 
 def search_tmdb_title(title: str, year: int | None = None) -> list[dict[str, Any]]:
@@ -8,7 +8,7 @@ from app import create_app
 from app.config import Config
 
 
-celery = Celery("showbuff_importer", include=["app.tasks.import_tasks"])
+celery = Celery("showbuff_importer", include=["app.tasks.import_tasks", "app.tasks.tmdb_tasks"])
 
 
 def _make_celery_app() -> Celery:
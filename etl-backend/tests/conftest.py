@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+
+import pytest
+
+from app import create_app, tmdb_client
+from app.config import Config
+from app.extensions import db
+from app.local_cache import LocalTTLCache
+
+
+@dataclass
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI: str = "sqlite:///:memory:"
+
+
+@pytest.fixture()
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+@pytest.fixture()
+def tmdb(monkeypatch):
+    """tmdb_client with an API key, no Redis and an empty in-process cache."""
+    monkeypatch.setattr(tmdb_client._get_config(), "TMDB_API_KEY", "test-key")
+    monkeypatch.setattr(tmdb_client, "_get_redis", lambda: None)
+    monkeypatch.setattr(tmdb_client, "_local_cache", LocalTTLCache(100, 10_000, 60))
+    monkeypatch.setattr(tmdb_client, "_buckets", {})
+    return tmdb_client
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from app import blob_store
+
+
+@pytest.fixture(autouse=True)
+def filesystem_blobs(app, tmp_path):
+    app.config["IMPORT_BLOB_BACKEND"] = "filesystem"
+    app.config["IMPORT_BLOB_DIR"] = str(tmp_path)
+    app.config["IMPORT_BLOB_INLINE_MAX_BYTES"] = 16
+
+
+def _read(ref):
+    with blob_store.local_path(ref) as path:
+        with open(path, "rb") as f:
+            return path, f.read()
+
+
+def test_small_payloads_stay_inline(app, tmp_path):
+    ref = blob_store.put(b"Inception (2010)", ".txt")
+    assert ref.startswith("inline:")
+    assert _read(ref)[1] == b"Inception (2010)"
+    assert list(tmp_path.iterdir()) == []
+    blob_store.delete(ref)
+
+
+@pytest.mark.parametrize("data", [b"The Matrix (1999)\n" * 1000, os.urandom(4096)], ids=["text", "random"])
+def test_stored_payloads_round_trip(app, tmp_path, data):
+    ref = blob_store.put(data, ".CSV")
+    (stored,) = tmp_path.iterdir()
+    # Text compresses well; incompressible bytes are stored as they are
+    assert stored.stat().st_size < len(data) / 10 or stored.stat().st_size == len(data) + 2
+
+    path, content = _read(ref)
+    assert content == data and path.endswith(".csv")
+
+    blob_store.delete(ref)
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(blob_store.BlobNotFoundError):
+        _read(ref)
+
+
+def test_redis_backend_round_trip(app, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    reads = []
+
+    class Client(fakeredis.FakeRedis):
+        def get(self, name):
+            pytest.fail("blob read in one piece")
+
+        def getrange(self, key, start, end):
+            reads.append(end - start + 1)
+            return super().getrange(key, start, end)
+
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_BACKEND", "redis")
+    monkeypatch.setattr(blob_store, "_redis_client", lambda: Client(server=server))
+    monkeypatch.setattr(blob_store, "_COPY_CHUNK_BYTES", 64)
+
+    data = b"Dune: Part Two (2024)\n" * 100
+    ref = blob_store.put(data, ".txt")
+    assert ref.startswith("redis:")
+    assert fakeredis.FakeRedis(server=server).ttl(blob_store._REDIS_KEY_PREFIX + ref[6:]) > 0
+    assert _read(ref)[1] == data
+    assert len(reads) > 2 and max(reads) == 64
+    blob_store.delete(ref)
+    with pytest.raises(blob_store.BlobNotFoundError):
+        _read(ref)
@@ -2,23 +2,9 @@ import io
 
 import pytest
 
-from app import create_app
-from app.config import Config
 from app.extensions import db
 
 
-class TestConfig(Config):
-    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
-
-
-@pytest.fixture()
-def app():
-    app = create_app(TestConfig)
-    with app.app_context():
-        db.create_all()
-    yield app
-
-
 @pytest.fixture()
 def client(app):
     return app.test_client()
@@ -31,11 +17,14 @@ def test_health(client):
     assert data["ok"] is True
 
 
-def test_import_file_enqueues_session(client, monkeypatch):
+def test_import_file_enqueues_session(app, client, monkeypatch, tmp_path):
     # Avoid actually calling Celery in tests
     import celery_app
 
-    monkeypatch.setattr(celery_app.celery, "send_task", lambda *a, **k: None)
+    sent = []
+    monkeypatch.setattr(celery_app.celery, "send_task", lambda *a, **k: sent.append(k))
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_BACKEND", "filesystem")
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_DIR", str(tmp_path))
 
     data = {
         "file": (io.BytesIO(b"The Matrix (1999)\nInception (2010)"), "movies.txt"),
@@ -47,3 +36,73 @@ def test_import_file_enqueues_session(client, monkeypatch):
     payload = resp.get_json()
     assert "importId" in payload
     assert payload["status"] == "pending"
+
+    # Small uploads ride along in the task message; larger ones go to the
+    # blob store and only their reference is queued
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_INLINE_MAX_BYTES", 40)
+    data["file"] = (io.BytesIO(b"The Matrix (1999)\n" * 10), "movies.txt")
+    assert client.post("/api/import/file", data=data, content_type="multipart/form-data").status_code == 200
+
+    kwargs = [k["kwargs"] for k in sent]
+    assert [k["file_format"] for k in kwargs] == [".txt", ".txt"]
+    assert kwargs[0]["blob_ref"].startswith("inline:")
+    assert kwargs[1]["blob_ref"].startswith("file:")
+    assert [p.suffix for p in tmp_path.iterdir()] == [".txt"]
+
+
+def test_import_file_records_size_and_hash_and_rejects_oversized(app, client, monkeypatch, tmp_path):
+    import hashlib
+    from uuid import UUID
+
+    import celery_app
+    from app.models import ImportSession
+
+    monkeypatch.setattr(celery_app.celery, "send_task", lambda *a, **k: None)
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_BACKEND", "filesystem")
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_DIR", str(tmp_path))
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_INLINE_MAX_BYTES", 0)
+    monkeypatch.setitem(app.config, "IMPORT_MAX_UPLOAD_BYTES", 1000)
+    body = b"Inception (2010)\n" * 50
+
+    resp = client.post("/api/import/file", data={"file": (io.BytesIO(body), "a.txt")})
+    assert resp.status_code == 200
+    with app.app_context():
+        session = db.session.get(ImportSession, UUID(resp.get_json()["importId"]))
+        assert (session.upload_bytes, session.upload_sha256) == (len(body), hashlib.sha256(body).hexdigest())
+        sessions = ImportSession.query.count()
+
+    # Over the import limit: rejected while copying, nothing left behind
+    resp = client.post("/api/import/file", data={"file": (io.BytesIO(body * 2), "b.txt")})
+    assert resp.status_code == 413
+    assert resp.get_json() == {"error": "file too large", "maxBytes": 1000}
+    assert len(list(tmp_path.iterdir())) == 1
+    with app.app_context():
+        assert ImportSession.query.count() == sessions
+
+    # Over MAX_CONTENT_LENGTH: refused before the body is parsed
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 500)
+    resp = client.post("/api/import/file", data={"file": (io.BytesIO(body), "c.txt")})
+    assert resp.status_code == 413
+    assert resp.get_json()["error"] == "file too large"
+
+
+def test_manual_search_with_override_drops_tv_hint(app, client, tmdb, monkeypatch):
+    from app.models import ExtractedTitle, ImportSession
+
+    endpoints = []
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", lambda endpoint, *a: endpoints.append(endpoint) or [])
+
+    with app.app_context():
+        session = ImportSession(source="file")
+        extracted = ExtractedTitle(import_session=session, raw_text="Fargo S01E01", normalized_title="Fargo", media_hint="tv")
+        db.session.add(extracted)
+        db.session.commit()
+        url = f"/api/import/{session.id}/titles/{extracted.id}/search"
+
+    resp = client.post(url, json={"year": 2014, "mediaHint": "tv"})
+    assert resp.get_json()["mediaHint"] == "tv"
+    assert endpoints == ["/search/tv"]
+
+    resp = client.post(url, json={"year": 1996})
+    assert resp.get_json()["mediaHint"] is None
+    assert sorted(endpoints[1:]) == ["/search/movie", "/search/tv"]
@@ -0,0 +1,29 @@
+import time
+
+from app.local_cache import LocalTTLCache
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    cache = LocalTTLCache(max_entries=2, max_bytes=100, ttl_seconds=60)
+    cache.set("a", [1], size=10)
+    cache.set("b", [2], size=10)
+    assert cache.get("a") == [1]  # "b" is now least recently used
+    cache.set("c", [3], size=10)
+    assert cache.get("b") is None
+
+    cache.set("d", [4], size=95)
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.get("d") == [4]
+
+    stats = cache.stats()
+    assert stats["evictions"] == 3
+    assert stats["entries"] == 1 and stats["bytes"] == 95
+    assert stats["hits"] == 2 and stats["misses"] == 3
+
+
+def test_entries_expire():
+    cache = LocalTTLCache(max_entries=10, max_bytes=1000, ttl_seconds=0.01)
+    cache.set("a", [1], size=1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
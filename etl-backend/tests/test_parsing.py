@@ -0,0 +1,113 @@
+import io
+import multiprocessing
+
+from app.importer.parsing import detect_title_columns, extract_titles_from_file, iter_titles_from_table
+
+
+def _summary(records):
+    return [(r.normalized_title, r.year, r.media_hint) for r in records]
+
+
+def test_csv_exports_read_only_title_and_year_columns():
+    letterboxd = b"Date,Name,Year,Letterboxd URI,Rating\n2023-01-02,The Matrix,1999,https://boxd.it/x,4.5\n"
+    netflix = b'Title,Date\n"Breaking Bad: Season 2: Grilled",12/01/2023\nInception (2010),12/02/2023\n'
+
+    assert _summary(iter_titles_from_table(io.BytesIO(letterboxd), ".csv")) == [("The Matrix", 1999, None)]
+    assert _summary(iter_titles_from_table(io.BytesIO(netflix), ".csv")) == [
+        ("Breaking Bad", None, "tv"),
+        ("Inception", 2010, None),
+    ]
+
+
+def test_column_map_overrides_detection(tmp_path):
+    assert detect_title_columns(["Const", "Title", "Original Title", "Year"]) == ("Title", "Year")
+
+    path = tmp_path / "list.tsv"
+    path.write_text("Film Name\tYr\tTitle Type\nHeat\t1995\tmovie\n")
+    records = extract_titles_from_file(str(path), {"title": "Film Name", "year": "yr"})
+    assert _summary(records) == [("Heat", 1995, None)]
+
+
+def test_tables_without_title_header_fall_back_to_all_cells():
+    records = iter_titles_from_table(io.BytesIO(b"foo,bar\nThe Matrix (1999),\n"), ".csv")
+    assert _summary(records) == [("The Matrix", 1999, None)]
+
+
+def _write_pdf(path, pages):
+    """Minimal PDF with one text line per entry of each page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = b"".join(b"BT /F1 12 Tf 72 %d Td (%s) Tj ET\n" % (720 - 20 * i, line.encode()) for i, line in enumerate(lines))
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(ops), ops))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R"
+            b" /Resources << /Font << /F1 3 0 R >> >> >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def _extract_pdf_in_child(path, queue):
+    import billiard
+
+    from app.importer import parsing
+
+    pools = []
+    parsing.billiard = type("billiard", (), {"Pool": lambda **kw: pools.append(kw) or billiard.Pool(**kw)})
+    try:
+        queue.put((list(parsing._iter_pdf_lines(path, workers=3, min_pages=2)), pools))
+    except Exception as exc:
+        queue.put(repr(exc))
+
+
+def test_pdf_pages_extracted_in_parallel_keep_page_order(tmp_path):
+    from app.importer.parsing import _iter_pdf_lines
+
+    path = tmp_path / "watched.pdf"
+    pages = [[f"Movie {page}-{line}" for line in range(3)] for page in range(10)]
+    _write_pdf(path, pages)
+
+    expected = [line for lines in pages for line in lines]
+    assert list(_iter_pdf_lines(str(path), workers=1)) == expected
+    assert list(_iter_pdf_lines(str(path), workers=3, min_pages=2)) == expected
+
+    # Like a Celery prefork child: daemonic, so billiard's pool does the work
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_extract_pdf_in_child, args=(str(path), queue), daemon=True)
+    child.start()
+    assert queue.get(timeout=60) == (expected, [{"processes": 3}])
+    child.join(timeout=10)
+
+
+def test_xlsx_sheets_are_streamed_by_column(tmp_path):
+    import datetime
+
+    import openpyxl
+
+    path = tmp_path / "ratings.xlsx"
+    workbook = openpyxl.Workbook()
+    ratings = workbook.active
+    ratings.append(["Const", "Date Rated", "Title", "Year"])
+    ratings.append(["tt0133093", datetime.date(2020, 1, 1), "The Matrix", 1999])
+    ratings.append(["tt8579674", datetime.date(2020, 1, 2), 1917, 2019.0])
+    notes = workbook.create_sheet("Notes")
+    notes.append(["Heat (1995)"])
+    workbook.save(path)
+
+    assert _summary(extract_titles_from_file(str(path))) == [
+        ("The Matrix", 1999, None),
+        ("1917", 2019, None),
+        ("Heat", 1995, None),
+    ]
@@ -0,0 +1,25 @@
+import time
+
+from app.rate_limit import TokenBucket
+
+
+def test_local_bucket_allows_burst_then_paces():
+    bucket = TokenBucket("test", rate=50, burst=3)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.acquire(timeout=0.001) is False
+
+    start = time.monotonic()
+    assert bucket.acquire() is True
+    assert 0.01 <= time.monotonic() - start < 0.1
+
+
+def test_throttle_pauses_and_halves_rate():
+    bucket = TokenBucket("test", rate=100, burst=5)
+    bucket.throttle(pause=0.05)
+
+    assert bucket.try_acquire() is False
+    start = time.monotonic()
+    assert bucket.acquire() is True
+    assert 0.04 <= time.monotonic() - start < 0.2
+    assert bucket._local_rate(time.monotonic()) < 100
@@ -0,0 +1,42 @@
+from app import schema
+
+
+def test_schema_upgrade_tolerates_a_concurrent_upgrade(app, monkeypatch):
+    # Another process adds the column between our check and our ALTER TABLE
+    checks = []
+    real_exists = schema._column_exists
+
+    def stale_then_real(table, column):
+        checks.append((table, column))
+        return len(checks) > 1 and real_exists(table, column)
+
+    monkeypatch.setattr(schema, "_ADDED_COLUMNS", schema._ADDED_COLUMNS[:1])
+    monkeypatch.setattr(schema, "_column_exists", stale_then_real)
+    schema.upgrade_schema()
+    assert checks == [("movies", "match_key")] * 2
+
+    # Indexes that already exist are skipped
+    schema._create_missing_indexes()
+
+
+def test_match_keys_are_rebuilt_when_the_key_version_changes(app):
+    from app.extensions import db
+    from app.models import AppSetting, Movie
+    from app.normalize import MATCH_KEY_VERSION
+
+    db.session.add(Movie(tmdb_id=194, title="Amélie", year=2001))
+    db.session.commit()
+    # As left by a release whose keys didn't fold accents
+    db.session.execute(db.text("UPDATE movies SET match_key = 'amélie'"))
+    db.session.merge(AppSetting(key="match_key_version", value="1"))
+    db.session.commit()
+
+    assert schema.sync_match_keys() == 1
+    assert Movie.query.one().match_key == "amelie"
+    assert db.session.get(AppSetting, "match_key_version").value == str(MATCH_KEY_VERSION)
+
+    # Up to date: only missing keys are filled in
+    db.session.execute(db.text("UPDATE movies SET match_key = 'stale'"))
+    db.session.commit()
+    assert schema.sync_match_keys() == 0
+    assert Movie.query.one().match_key == "stale"
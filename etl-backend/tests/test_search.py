@@ -0,0 +1,293 @@
+import warnings
+
+import pytest
+from sqlalchemy.exc import SAWarning
+
+from app.extensions import db
+from app.models import Movie, TVShow, ImportSession, ExtractedTitle
+from app.importer.search import find_local_matches_bulk, find_matches_for_extracted_title
+
+
+def _seed_catalog():
+    db.session.add_all(
+        [
+            Movie(tmdb_id=603, title="The Matrix", year=1999, popularity=80.0),
+            Movie(tmdb_id=604, title="The Matrix", year=2021, popularity=None),
+            Movie(tmdb_id=27205, title="Inception", year=2010, popularity=90.0),
+            TVShow(tmdb_id=2316, name="The Office", first_air_year=2005, popularity=70.0),
+            TVShow(tmdb_id=2996, name="The Office", first_air_year=2001, popularity=30.0),
+        ]
+    )
+    db.session.commit()
+
+
+def _match_summary(matches):
+    return [(m.media_type, m.tmdb_id, m.local_id, m.match_method, m.is_ambiguous) for m in matches]
+
+
+def test_bulk_local_matches_equal_single_title_matches(app):
+    _seed_catalog()
+    session = ImportSession(source="file")
+    db.session.add(session)
+
+    inputs = [
+        ("the matrix", None),
+        ("The Matrix", 1999),
+        ("Inception", 2011),
+        ("THE OFFICE", None),
+        ("Unknown Title", None),
+        ("", None),
+    ]
+    extracted = [ExtractedTitle(import_session=session, raw_text=t, normalized_title=t, year=y) for t, y in inputs]
+    db.session.add_all(extracted)
+    db.session.flush()
+
+    bulk = find_local_matches_bulk(extracted)
+    db.session.add_all(m for matches in bulk for m in matches)
+    single = []
+    for e in extracted:
+        single.append(find_matches_for_extracted_title(e))
+        db.session.add_all(single[-1])
+
+    assert [_match_summary(m) for m in bulk] == [_match_summary(m) for m in single]
+    assert [m.tmdb_id for m in bulk[0]] == [603, 604]
+    assert [m.tmdb_id for m in bulk[1]] == [603]
+    assert bulk[1][0].is_ambiguous is False
+    assert [m.tmdb_id for m in bulk[3]] == [2316, 2996]
+    assert bulk[2] == [] and bulk[4] == [] and bulk[5] == []
+
+
+def test_match_key_normalizes_articles_and_punctuation(app):
+    _seed_catalog()
+    session = ImportSession(source="file")
+    extracted = [
+        ExtractedTitle(import_session=session, raw_text=t, normalized_title=t, year=None)
+        for t in ("Matrix, The", "THE MATRIX!", "ｔｈｅ ｍａｔｒｉｘ", "The  Matrix.")
+    ]
+    db.session.add_all(extracted)
+    db.session.flush()
+
+    for matches in find_local_matches_bulk(extracted):
+        assert [m.tmdb_id for m in matches] == [603, 604]
+
+
+def test_backfill_populates_missing_match_keys(app):
+    from app.schema import backfill_match_keys
+
+    _seed_catalog()
+    db.session.execute(db.text("UPDATE movies SET match_key = NULL"))
+    db.session.commit()
+
+    assert backfill_match_keys() == 3
+    assert {m.match_key for m in Movie.query.all()} == {"matrix", "inception"}
+
+
+def test_fuzzy_tier_resolves_near_misses_locally(app, monkeypatch):
+    from app.importer import search
+
+    _seed_catalog()
+    monkeypatch.setattr(search, "search_tmdb_movies_and_tv", lambda *a, **k: pytest.fail("TMDB should not be called"))
+
+    session = ImportSession(source="file")
+    extracted = ExtractedTitle(import_session=session, raw_text="Incepton", normalized_title="Incepton", year=2010)
+    db.session.add(extracted)
+    db.session.flush()
+
+    matches = find_matches_for_extracted_title(extracted)
+    assert [(m.tmdb_id, m.match_method, m.is_ambiguous) for m in matches] == [(27205, "local_fuzzy", False)]
+    assert 0 < matches[0].confidence < 0.9
+
+    # Postgres without pg_trgm doesn't fall back to scanning the catalog
+    with monkeypatch.context() as m:
+        m.setattr(search, "_use_pg_trgm", lambda: False)
+        m.setattr(db.engine.dialect, "name", "postgresql")
+        assert search._fuzzy_candidates(Movie, Movie.year, "incepton", 2010, 0.5) == []
+
+
+def test_iter_matches_batches_tmdb_searches_for_misses(app, tmdb, monkeypatch):
+    import threading
+
+    from app.importer import search
+
+    _seed_catalog()
+    calls = []
+
+    def fake_fetch(endpoint, bucket, title, year):
+        calls.append((endpoint, title, threading.current_thread().name))
+        if endpoint == "/search/tv":
+            return []
+        return [{"id": 1000 + len(title), "title": title, "release_date": "2020-01-01", "popularity": 1.0}]
+
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", fake_fetch)
+
+    session = ImportSession(source="file")
+    titles = ["Zzyzx Road", "Inception", "Qwerty Uiop Asdf", "Zzyzx Road"]
+    extracted = [ExtractedTitle(import_session=session, raw_text=t, normalized_title=t, year=None) for t in titles]
+    db.session.add_all(extracted)
+    db.session.flush()
+
+    results = []
+    for idx, matches in search.iter_matches_for_extracted_titles(extracted, max_concurrency=4):
+        db.session.add_all(matches)  # as the import task does
+        results.append((idx, matches))
+
+    assert [idx for idx, _ in results] == [1, 0, 2, 3]
+    assert results[0][1][0].match_method == "local_exact"
+    assert [(m.match_method, m.tmdb_id) for m in results[1][1]] == [("tmdb_search", 1010)]
+    assert [m.tmdb_id for m in results[3][1]] == [1010]
+    assert Movie.query.filter_by(tmdb_id=1016).one().title == "Qwerty Uiop Asdf"
+    # Duplicate titles are fetched once; misses run on the worker pool.
+    assert len(calls) == 4
+    assert all(name.startswith("tmdb-search") for _, _, name in calls)
+
+
+def test_import_matches_each_repeated_title_once(app, monkeypatch):
+    from app.tasks import import_tasks
+
+    _seed_catalog()
+    session = ImportSession(source="file")
+    db.session.add(session)
+    db.session.commit()
+
+    resolved = []
+    real_iter = import_tasks.iter_matches_for_extracted_titles
+
+    def counting_iter(extracted_titles):
+        resolved.extend(e.normalized_title for e in extracted_titles)
+        return real_iter(extracted_titles)
+
+    monkeypatch.setattr(import_tasks, "iter_matches_for_extracted_titles", counting_iter)
+    # Small chunks, so repeats are also recognised across chunks
+    monkeypatch.setattr(import_tasks, "_IMPORT_CHUNK_SIZE", 2)
+    text = "The Matrix (1999)\nInception (2010)\nMatrix, The (1999)\nthe matrix (1999)\nInception (2010)"
+    with warnings.catch_warnings():
+        # e.g. "TitleMatch not in session" from autoflushing half-built matches
+        warnings.simplefilter("error", SAWarning)
+        import_tasks.process_import_file.run(str(session.id), text, None, None)
+
+    assert resolved == ["The Matrix", "Inception"]
+    session = db.session.get(ImportSession, session.id)
+    assert (session.total_titles, session.unique_titles, session.matched_count) == (5, 2, 5)
+    for extracted in session.extracted_titles:
+        assert [m.tmdb_id for m in extracted.matches] == ([27205] if extracted.year == 2010 else [603])
+
+
+def test_episode_lines_collapse_to_series_and_search_tv_only(app, tmdb, monkeypatch):
+    from app.importer.parsing import extract_titles_from_text
+    from app.importer.search import iter_matches_for_extracted_titles
+
+    records = extract_titles_from_text(
+        "Breaking Bad: Season 2: Grilled\nBreaking Bad S02E03\nKill Bill: Volume 1\nDune: Part Two\n"
+        "John Wick: Chapter 3 - Parabellum\nStar Wars: Episode 1 - The Phantom Menace"
+    )
+    assert [(r.normalized_title, r.media_hint) for r in records] == [
+        ("Breaking Bad", "tv"),
+        ("Breaking Bad", "tv"),
+        ("Kill Bill: Volume 1", None),
+        ("Dune: Part Two", None),
+        ("John Wick: Chapter 3 - Parabellum", None),
+        ("Star Wars: Episode 1 - The Phantom Menace", None),
+    ]
+
+    calls = []
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", lambda endpoint, bucket, title, year: calls.append(endpoint) or [])
+
+    session = ImportSession(source="file")
+    extracted = ExtractedTitle(
+        import_session=session, raw_text=records[0].raw_text, normalized_title="Breaking Bad", media_hint="tv"
+    )
+    db.session.add(extracted)
+    db.session.flush()
+    list(iter_matches_for_extracted_titles([extracted], max_concurrency=1))
+    assert calls == ["/search/tv"]
+
+
+def test_import_reads_binary_upload_from_blob_store(app, monkeypatch, tmp_path):
+    import openpyxl
+
+    from app import blob_store
+    from app.tasks.import_tasks import process_import_file
+
+    _seed_catalog()
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_BACKEND", "filesystem")
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setitem(app.config, "IMPORT_BLOB_INLINE_MAX_BYTES", 0)
+
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["Title", "Year"])
+    workbook.active.append(["Inception", 2010])
+    workbook.save(tmp_path / "list.xlsx")
+
+    session = ImportSession(source="file", original_filename="list.xlsx")
+    db.session.add(session)
+    db.session.commit()
+    blob_ref = blob_store.put((tmp_path / "list.xlsx").read_bytes(), ".xlsx")
+
+    process_import_file.run(str(session.id), None, None, None, blob_ref=blob_ref, file_format=".xlsx")
+
+    session = db.session.get(ImportSession, session.id)
+    assert (session.status, session.total_titles, session.matched_count) == ("completed", 1, 1)
+    assert [m.tmdb_id for m in session.extracted_titles[0].matches] == [27205]
+    # Consumed blobs are removed; a missing one fails the import
+    assert list((tmp_path / "blobs").iterdir()) == []
+    process_import_file.run(str(session.id), None, None, None, blob_ref=blob_ref, file_format=".xlsx")
+    assert db.session.get(ImportSession, session.id).status == "failed"
+
+    # An unreadable upload fails the import and its blob is still removed
+    session = ImportSession(source="file", original_filename="history.pdf")
+    db.session.add(session)
+    db.session.commit()
+    blob_ref = blob_store.put(b"%PDF-1.4 this is not really a pdf", ".pdf")
+    process_import_file.run(str(session.id), None, None, None, blob_ref=blob_ref, file_format=".pdf")
+    assert db.session.get(ImportSession, session.id).status == "failed"
+    assert list((tmp_path / "blobs").iterdir()) == []
+
+
+def test_inconclusive_fuzzy_matches_still_search_tmdb(app, tmdb, monkeypatch):
+    from app.importer import search
+
+    db.session.add_all(
+        [
+            Movie(tmdb_id=862, title="Toy Story", year=1995, popularity=50.0),
+            Movie(tmdb_id=348, title="Alien", year=1979, popularity=40.0),
+        ]
+    )
+    db.session.commit()
+    remote = {"Toy Story 2": (863, "1999-10-30"), "Aliens": (679, "1986-07-18")}
+    searched = []
+
+    def fake_fetch(endpoint, bucket, title, year):
+        searched.append(title)
+        if endpoint == "/search/tv" or title not in remote:
+            return []
+        tmdb_id, release_date = remote[title]
+        return [{"id": tmdb_id, "title": title, "release_date": release_date, "popularity": 1.0}]
+
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", fake_fetch)
+
+    session = ImportSession(source="file")
+    inputs = [("Toy Story 2", None), ("Aliens", None), ("Toy Storry", 1995)]
+    extracted = [ExtractedTitle(import_session=session, raw_text=t, normalized_title=t, year=y) for t, y in inputs]
+    db.session.add_all(extracted)
+    db.session.flush()
+
+    results = {}
+    for idx, matches in search.iter_matches_for_extracted_titles(extracted, max_concurrency=1):
+        db.session.add_all(matches)
+        results[idx] = matches
+    summary = {idx: [(m.tmdb_id, m.match_method, m.is_ambiguous) for m in ms] for idx, ms in results.items()}
+    # Sequel and plural: TMDB's answer first, the fuzzy look-alike kept as an ambiguous option
+    assert summary[0] == [(863, "tmdb_search", True), (862, "local_fuzzy", True)]
+    assert summary[1] == [(679, "tmdb_search", True), (348, "local_fuzzy", True)]
+    # A typo with a matching year is settled locally
+    assert summary[2] == [(862, "local_fuzzy", False)]
+    assert sorted(set(searched)) == ["Aliens", "Toy Story 2"]
+    assert all(m.extracted_title is extracted[idx] for idx, ms in results.items() for m in ms)
+
+    # The single-title path (manual re-search) behaves the same
+    retry = ExtractedTitle(import_session=session, raw_text="Toy Story II", normalized_title="Toy Story II", year=None)
+    db.session.add(retry)
+    matches = find_matches_for_extracted_title(retry)
+    # "Toy Story 2" is in the catalog by now, but without a year it isn't conclusive either
+    assert sorted((m.tmdb_id, m.is_ambiguous) for m in matches) == [(862, True), (863, True)]
+    assert "Toy Story II" in searched
@@ -0,0 +1,296 @@
+import threading
+
+import pytest
+import requests
+
+from app import tmdb_client
+from app.circuit_breaker import CircuitBreaker
+
+
+def test_multi_search_mode_uses_one_call_per_title(tmdb, monkeypatch):
+    calls = []
+
+    def fake_fetch(endpoint, bucket, title, year):
+        calls.append((endpoint, year))
+        return [
+            {"id": 1, "media_type": "movie", "title": title, "release_date": "1999-03-31"},
+            {"id": 2, "media_type": "movie", "title": title, "release_date": "2021-12-22"},
+            {"id": 3, "media_type": "tv", "name": title, "first_air_date": "1999-01-01"},
+            {"id": 4, "media_type": "person", "name": title},
+        ]
+
+    monkeypatch.setattr(tmdb_client._get_config(), "TMDB_SEARCH_MODE", "multi")
+    monkeypatch.setattr(tmdb_client, "_fetch_tmdb", fake_fetch)
+
+    movies, shows = tmdb_client.search_tmdb_movies_and_tv("The Matrix", 1999)
+    assert [m["id"] for m in movies] == [1] and [s["id"] for s in shows] == [3]
+
+    batch = tmdb_client.search_many([("The Matrix", None, "movie"), ("The Matrix", 2021, "tv")])
+    assert [[r["id"] for r in res] for res in batch] == [[1, 2], []]
+    assert calls == [("/search/multi", None)]
+
+
+class _FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self._payload = payload or {}
+
+    def json(self):
+        return self._payload
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_fetch_retries_transient_failures(tmdb, monkeypatch):
+    session = _FakeSession(
+        [
+            requests.ConnectionError("reset"),
+            _FakeResponse(503),
+            _FakeResponse(200, {"results": [{"id": 603}]}),
+        ]
+    )
+    monkeypatch.setattr(tmdb_client, "_http_session", lambda: session)
+    monkeypatch.setattr(tmdb_client, "_circuit", CircuitBreaker("test", 10, 60, 30))
+    monkeypatch.setattr(tmdb_client._get_config(), "TMDB_RETRY_BACKOFF_BASE", 0.001)
+
+    assert tmdb_client.search_tmdb_movies("The Matrix") == [{"id": 603}]
+    assert session.calls == 3
+
+
+def test_open_circuit_fails_fast(tmdb, monkeypatch):
+    session = _FakeSession([_FakeResponse(500)] * 4)
+    monkeypatch.setattr(tmdb_client, "_http_session", lambda: session)
+    monkeypatch.setattr(tmdb_client, "_circuit", CircuitBreaker("test", 2, 60, 30))
+    monkeypatch.setattr(tmdb_client._get_config(), "TMDB_RETRY_BACKOFF_BASE", 0.001)
+
+    with pytest.raises(tmdb_client.TMDBUnavailableError):
+        tmdb_client.search_tmdb_movies("The Matrix")
+    assert session.calls == 2
+
+    with pytest.raises(tmdb_client.TMDBUnavailableError):
+        tmdb_client.search_many([("Inception", None, "movie")])
+    assert session.calls == 2
+
+
+def test_stale_entry_is_served_and_refreshed_in_background(tmdb, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.FakeRedis()
+    monkeypatch.setattr(tmdb, "_get_redis", lambda: redis_client)
+
+    key = tmdb._search_cache_key(tmdb._SEARCH_ENDPOINTS["movie"][1], "Heat", 1995)
+    stale = tmdb._CacheEntry(results=[{"id": 1}], fetched_at=1.0)
+    redis_client.set(key, tmdb._encode_entry(stale))
+
+    scheduled = []
+    monkeypatch.setattr(tmdb, "_schedule_refresh", lambda *args: scheduled.append(args))
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", lambda *args: [{"id": 2}])
+
+    assert tmdb.search_tmdb_movies("Heat", 1995) == [{"id": 1}]
+    assert scheduled == [(key, "movie", "Heat", 1995)]
+
+    tmdb.refresh_search("movie", "Heat", 1995)
+    assert tmdb.search_tmdb_movies("Heat", 1995) == [{"id": 2}]
+    assert len(scheduled) == 1
+
+
+def test_cache_encoding_keeps_only_matcher_fields(tmdb, monkeypatch):
+    monkeypatch.setattr(tmdb._get_config(), "TMDB_CACHE_COMPRESS_MIN_BYTES", 64)
+    result = {
+        "id": 603,
+        "title": "The Matrix",
+        "original_title": "The Matrix",
+        "release_date": "1999-03-31",
+        "popularity": 81.5,
+        "adult": False,
+        "poster_path": "/p.jpg",
+        "overview": "A hacker learns the truth. " * 20,
+        "genre_ids": [28, 878],
+    }
+    entry = tmdb._entry_from_fetch([result] * 5)
+    raw = tmdb._encode_entry(entry)
+    assert raw[0] == tmdb._CACHE_FORMAT_VERSION and raw[1] & tmdb._FLAG_ZLIB
+
+    decoded = tmdb._decode_cached(raw)
+    assert decoded == entry
+    assert decoded.results[0] == {k: v for k, v in result.items() if k not in ("overview", "genre_ids")}
+
+    empty = tmdb._entry_from_fetch([])
+    assert tmdb._decode_cached(tmdb._encode_entry(empty)) == empty
+    assert tmdb._decode_cached(b"\x63" + raw[1:]) is None  # unknown version
+
+    legacy = tmdb._decode_cached(b'{"t": 5.0, "r": [{"id": 1, "overview": "x"}]}')
+    assert legacy == tmdb._CacheEntry(results=[{"id": 1}], fetched_at=5.0)
+
+
+def test_title_variants_share_one_search_cache_entry(tmdb, monkeypatch):
+    from app.importer.parsing import extract_titles_from_text
+    from app.normalize import normalize_match_key
+
+    calls = []
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", lambda endpoint, bucket, title, year: calls.append(title) or [{"id": 194}])
+
+    records = extract_titles_from_text("Amélie (2001)\nAmelie (2001)\n  amélie.  (2001)\nMatrix, The\nthe  matrix")
+    assert [r.normalized_title for r in records][3:] == ["The Matrix", "the matrix"]
+    assert len({normalize_match_key(r.normalized_title) for r in records}) == 2
+
+    batch = tmdb.search_many([(r.normalized_title, r.year, "movie") for r in records])
+    assert all(res == [{"id": 194}] for res in batch)
+    assert calls == ["Amélie", "The Matrix"]
+
+
+def test_redis_client_is_created_lazily_and_dropped_after_fork(monkeypatch):
+    monkeypatch.setattr(tmdb_client, "_redis_client", None)
+    monkeypatch.setattr(tmdb_client, "_redis_initialized", False)
+    monkeypatch.setattr(tmdb_client, "_config", None)
+
+    client = tmdb_client._get_redis()
+    pool = client.connection_pool
+    assert tmdb_client._get_redis() is client
+    assert pool.connection_kwargs["health_check_interval"] == tmdb_client._get_config().REDIS_HEALTH_CHECK_INTERVAL
+
+    monkeypatch.setattr(tmdb_client, "_circuit", None)
+    monkeypatch.setattr(tmdb_client, "_session", None)
+    tmdb_client._reset_after_fork()
+    assert tmdb_client._redis_client is None and tmdb_client._config is None
+    assert tmdb_client._get_redis() is not client
+
+    # Building the circuit first must not deadlock on the init lock
+    tmdb_client._reset_after_fork()
+    worker = threading.Thread(target=tmdb_client._get_circuit, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive() and tmdb_client._circuit is not None
+
+
+def test_negative_results_are_cached_with_their_own_ttls(tmdb, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.FakeRedis()
+    monkeypatch.setattr(tmdb, "_get_redis", lambda: redis_client)
+    config = tmdb._get_config()
+    monkeypatch.setattr(config, "TMDB_EMPTY_CACHE_TTL_SECONDS", 600)
+    monkeypatch.setattr(config, "TMDB_ERROR_CACHE_TTL_SECONDS", 30)
+    monkeypatch.setattr(config, "TMDB_CACHE_STALE_GRACE_SECONDS", 3600)
+
+    outcomes = {"Nothing": [], "Broken": None}
+    calls = []
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", lambda endpoint, bucket, title, year: calls.append(title) or outcomes[title])
+
+    def key(title):
+        return tmdb._search_cache_key(tmdb._SEARCH_ENDPOINTS["movie"][1], title, None)
+
+    before = tmdb.get_stats()["cache"]
+    for _ in range(2):
+        assert tmdb.search_tmdb_movies("Nothing") == []
+        assert tmdb.search_tmdb_movies("Broken") == []
+    assert calls == ["Nothing", "Broken"]
+    stats = tmdb.get_stats()["cache"]
+    assert stats["negative_hits_empty"] - before["negative_hits_empty"] == 1
+    assert stats["negative_hits_error"] - before["negative_hits_error"] == 1
+
+    # Empty results keep the stale grace window; failed lookups don't
+    assert 3600 < redis_client.ttl(key("Nothing")) <= 600 + 3600
+    assert 0 < redis_client.ttl(key("Broken")) <= 30
+
+    # A stale error entry still in Redis is refetched, never served
+    old_error = tmdb._CacheEntry(results=[], negative=tmdb._NEGATIVE_ERROR, fetched_at=1.0)
+    redis_client.set(key("Broken"), tmdb._encode_entry(old_error))
+    tmdb._get_local_cache().delete(key("Broken"))
+    outcomes["Broken"] = [{"id": 7}]
+    assert tmdb.search_many([("Broken", None, "movie")]) == [[{"id": 7}]]
+    assert calls == ["Nothing", "Broken", "Broken"]
+
+
+@pytest.fixture()
+def shared_redis(tmdb, monkeypatch):
+    """A fake Redis shared with "other processes"; EVAL needs lupa."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis_client = fakeredis.FakeRedis()
+    monkeypatch.setattr(tmdb, "_get_redis", lambda: redis_client)
+    return redis_client
+
+
+def _movie_key(tmdb, title):
+    return tmdb._search_cache_key(tmdb._SEARCH_ENDPOINTS["movie"][1], title, None)
+
+
+def test_follower_reads_the_leaders_entry(tmdb, shared_redis, monkeypatch):
+    key = _movie_key(tmdb, "Heat")
+    shared_redis.set(tmdb._lock_key(key), "other-process")
+
+    def leader_finishes(seconds):
+        entry = tmdb._CacheEntry(results=[{"id": 949}], negative=None, fetched_at=tmdb.time.time())
+        shared_redis.set(key, tmdb._encode_entry(entry))
+        shared_redis.delete(tmdb._lock_key(key))
+
+    monkeypatch.setattr(tmdb.time, "sleep", leader_finishes)
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", lambda *args: pytest.fail("follower fetched from TMDB"))
+
+    before = tmdb.get_stats()["cache"]
+    assert tmdb.search_tmdb_movies("Heat") == [{"id": 949}]
+    assert tmdb.get_stats()["cache"]["coalesced_hits"] - before["coalesced_hits"] == 1
+
+
+def test_lost_lock_makes_the_follower_fetch_itself(tmdb, shared_redis, monkeypatch):
+    key = _movie_key(tmdb, "Heat")
+    shared_redis.set(tmdb._lock_key(key), "other-process")
+    monkeypatch.setattr(tmdb.time, "sleep", lambda seconds: shared_redis.delete(tmdb._lock_key(key)))
+    calls = []
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", lambda endpoint, bucket, title, year: calls.append(title) or [{"id": 949}])
+
+    assert tmdb.search_tmdb_movies("Heat") == [{"id": 949}]
+    assert calls == ["Heat"]
+    assert tmdb._decode_cached(shared_redis.get(key)).results == [{"id": 949}]
+
+
+def test_single_flight_timeout_falls_back_to_fetching(tmdb, shared_redis, monkeypatch):
+    monkeypatch.setattr(tmdb._get_config(), "TMDB_SINGLE_FLIGHT_TIMEOUT_SECONDS", 0.1)
+    key = _movie_key(tmdb, "Heat")
+    shared_redis.set(tmdb._lock_key(key), "other-process")
+    calls = []
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", lambda endpoint, bucket, title, year: calls.append(title) or [{"id": 949}])
+
+    before = tmdb.get_stats()["cache"]
+    assert tmdb.search_tmdb_movies("Heat") == [{"id": 949}]
+    assert calls == ["Heat"]
+    assert tmdb.get_stats()["cache"]["single_flight_timeouts"] - before["single_flight_timeouts"] == 1
+    # The slow leader still owns its lock
+    assert shared_redis.get(tmdb._lock_key(key)) == b"other-process"
+
+
+def test_leader_stores_each_key_and_releases_only_its_own_lock(tmdb, shared_redis, monkeypatch):
+    def fetch(endpoint, bucket, title, year):
+        if title == "Taken Over":
+            # Each key is stored and unlocked as soon as it is fetched, not
+            # with the rest of the batch
+            assert shared_redis.get(_movie_key(tmdb, "Heat")) is not None
+            assert shared_redis.get(tmdb._lock_key(_movie_key(tmdb, "Heat"))) is None
+            # Our lock expired mid-fetch and another process took the key
+            shared_redis.set(tmdb._lock_key(_movie_key(tmdb, title)), "other-process")
+        return [{"id": 1}]
+
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", fetch)
+    tmdb.search_many([("Heat", None, "movie"), ("Taken Over", None, "movie")])
+    assert shared_redis.get(tmdb._lock_key(_movie_key(tmdb, "Heat"))) is None
+    assert shared_redis.get(tmdb._lock_key(_movie_key(tmdb, "Taken Over"))) == b"other-process"
+
+    def unavailable(*args):
+        raise tmdb.TMDBUnavailableError("circuit open")
+
+    monkeypatch.setattr(tmdb, "_fetch_tmdb", unavailable)
+    with pytest.raises(tmdb.TMDBUnavailableError):
+        tmdb.search_tmdb_movies("Ronin")
+    assert shared_redis.get(tmdb._lock_key(_movie_key(tmdb, "Ronin"))) is None